@@ -16,6 +16,8 @@ Typical use
 """
 
 from .oifits import *
+from .catalog import *
+from .stream import *
 
 __version__ = "0.4.7"
 __author__ = "Régis Lachaume"
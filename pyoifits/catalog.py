@@ -0,0 +1,508 @@
+"""
+Summaries of the contents of OIFITS files, obtained without loading the
+interferometric data, and persistent catalogs built from them.
+"""
+
+import os as _os
+import re as _re
+import gzip as _gzip
+import builtins as _builtins
+import functools as _functools
+import sqlite3 as _sqlite3
+
+from astropy.io import fits as _fits
+import numpy as _np
+
+from . import utils as _u
+from . import oifits as _oifits
+
+_EXTENSIONS = ('.fits', '.fits.gz', '.oifits', '.oifits.gz')
+
+def scan(paths, *, workers=None, executor=None, ignore_errors=False):
+    """
+
+Summarise the contents of OIFITS files, only reading the headers, the
+small OI_TARGET and OI_WAVELENGTH tables, and the MJD columns.
+
+Arguments
+---------
+
+paths (str or list of str)
+    File names or directories.  Directories are searched recursively
+    for files ending in .fits, .oifits, .fits.gz, or .oifits.gz.
+
+Keyword arguments
+-----------------
+
+workers (int, optional, default: None)
+    Number of threads scanning the files concurrently.
+executor (concurrent.futures.Executor, optional, default: None)
+    Executor scanning the files concurrently, for instance a
+    ProcessPoolExecutor.  It cannot be used together with workers.
+ignore_errors (bool, optional, default: False)
+    Whether files that cannot be read are skipped rather than raising
+    an exception.
+
+Returns
+-------
+
+summaries (list of dict)
+    One summary per file with
+    * filename (str)
+    * version (int): OIFITS version
+    * targets, insnames, arrnames, corrnames (list of str)
+    * mjd_min, mjd_max (float): dates of observations (NaN if no data)
+    * wavelmin, wavelmax (float): wavelength range in m (NaN if none)
+    * nrows (dict): total number of rows for each extension name
+    * hdus (list of dict): for each OI extension, extname, insname,
+      arrname, corrname, nrows, mjd_min, mjd_max, wavelmin, wavelmax.
+
+    """
+    filenames = _find_files(paths)
+    scan_file = _functools.partial(_scan_file, ignore_errors=ignore_errors)
+    summaries = _u.executor_map(scan_file, filenames,
+                    workers=workers, executor=executor)
+
+    return [s for s in summaries if s is not None]
+
+def _find_files(paths):
+
+    if isinstance(paths, (str, _os.PathLike)):
+        paths = [paths]
+
+    filenames = []
+    for path in paths:
+        path = _os.fspath(path)
+        if not _os.path.isdir(path):
+            filenames.append(path)
+            continue
+        for dirpath, dirnames, names in _os.walk(path):
+            dirnames.sort()
+            filenames += [_os.path.join(dirpath, name) for name in sorted(names)
+                            if name.lower().endswith(_EXTENSIONS)]
+
+    return filenames
+
+def _scan_file(filename, ignore_errors=False):
+
+    try:
+        return _summarise(filename)
+    except (OSError, ValueError, KeyError):
+        if ignore_errors:
+            return None
+        raise
+
+# Headers are parsed directly and only the bytes of needed columns are
+# decoded: astropy HDU objects cost milliseconds each (column definitions,
+# FITS_rec views), far more than the actual I/O.
+
+_TFORM = _re.compile(r'\s*(\d*)([LXBIJKAEDCMPQ])')
+_TFORM_SIZE = {'L': 1, 'B': 1, 'I': 2, 'J': 4, 'K': 8, 'A': 1, 'E': 4,
+               'D': 8, 'C': 8, 'M': 16, 'P': 8, 'Q': 16}
+_TFORM_DTYPE = {'L': 'i1', 'B': 'u1', 'I': '>i2', 'J': '>i4', 'K': '>i8',
+                'E': '>f4', 'D': '>f8'}
+
+# Size (bytes) of the blocks of rows read from compressed files
+_READ_BLOCK_SIZE = 2**20
+
+def _open_file(filename):
+
+    if filename.lower().endswith('.gz'):
+        return _gzip.open(filename, 'rb')
+    return _builtins.open(filename, 'rb')
+
+def _iter_headers(fileobj):
+    """Yield (header, data offset) for each HDU of a FITS file."""
+
+    while True:
+        try:
+            header = _fits.Header.fromfile(fileobj)
+        except EOFError:
+            return
+        offset = fileobj.tell()
+        yield header, offset
+        naxis = [header.get(f"NAXIS{i}", 0) 
+                    for i in range(1, header.get('NAXIS', 0) + 1)]
+        if header.get('GROUPS', False) and naxis:
+            naxis = naxis[1:]
+        size = _np.prod(naxis) if naxis else 0
+        size = abs(header.get('BITPIX', 8)) // 8 * header.get('GCOUNT', 1) * (
+                    header.get('PCOUNT', 0) + size)
+        fileobj.seek(offset + -(-int(size) // 2880) * 2880)
+
+def _read_column(fileobj, header, offset, name):
+    """Read a column of a binary table, None if absent."""
+
+    start = 0
+    for index in range(1, header.get('TFIELDS', 0) + 1):
+        repeat, code = _TFORM.match(header[f"TFORM{index}"]).groups()
+        repeat = int(repeat or 1)
+        if code == 'X':
+            width = -(-repeat // 8)
+        elif code in 'PQ':
+            width = _TFORM_SIZE[code]
+        else:
+            width = repeat * _TFORM_SIZE[code]
+        if header.get(f"TTYPE{index}", '').strip().upper() == name:
+            break
+        start += width
+    else:
+        return None
+
+    if code == 'A':
+        fmt = f"S{repeat}"
+    elif code in _TFORM_DTYPE:
+        fmt = _TFORM_DTYPE[code]
+        if repeat > 1:
+            fmt = (fmt, (repeat,))
+    else:
+        return None
+
+    rowsize, nrows = header['NAXIS1'], header['NAXIS2']
+    dtype = _np.dtype(dict(names=['x'], formats=[fmt], offsets=[start],
+                                itemsize=rowsize))
+    if not nrows:
+        return _np.zeros(0, dtype=dtype)['x']
+
+    # Files are memory-mapped, so that only the pages holding the column
+    # are read.  Compressed files are read by blocks of rows, the column
+    # being extracted from each.
+    if not isinstance(fileobj, _gzip.GzipFile):
+        rows = _np.memmap(fileobj, dtype=dtype, mode='r', offset=offset,
+                          shape=(nrows,))
+        return _np.array(rows['x'])
+
+    fileobj.seek(offset)
+    block = max(1, _READ_BLOCK_SIZE // rowsize)
+    columns = []
+    for first in range(0, nrows, block):
+        count = min(block, nrows - first)
+        buffer = fileobj.read(rowsize * count)
+        rows = _np.frombuffer(buffer, dtype=dtype, count=count)
+        columns.append(rows['x'].copy())
+
+    return _np.concatenate(columns)
+
+def _minmax(values):
+
+    values = _np.asarray(values, dtype=float).ravel()
+    values = values[_np.isfinite(values)]
+    if not len(values):
+        return _np.nan, _np.nan
+    return float(values.min()), float(values.max())
+
+def _summarise(filename):
+
+    targets = []
+    waves = {}
+    hdus = []
+    
+    with _open_file(filename) as fileobj:
+        
+        headers = _iter_headers(fileobj)
+        
+        primary, offset = next(headers, (None, None))
+        if primary is None or not primary.get('SIMPLE', False):
+            raise OSError(f"{filename} is not a FITS file")
+        version = 2 if primary.get('CONTENT', '') == 'OIFITS2' else 1
+
+        for header, offset in headers:
+
+            extname = header.get('EXTNAME', '')
+            if (extname[0:3] != 'OI_' or 
+                    header.get('XTENSION', '') != 'BINTABLE'):
+                continue
+            
+            def read(name):
+                return _read_column(fileobj, header, offset, name)
+
+            nrows = header.get('NAXIS2', 0)
+            if extname == 'OI_TARGET':
+                names = read('TARGET')
+                if names is not None:
+                    targets += [t.decode().strip() for t in names]
+            elif extname == 'OI_WAVELENGTH':
+                wave = read('EFF_WAVE')
+                if wave is not None:
+                    waves[header.get('INSNAME', '')] = _minmax(wave)
+
+            mjd_min, mjd_max = _np.nan, _np.nan
+            if nrows and (mjd := read('MJD')) is not None:
+                mjd_min, mjd_max = _minmax(mjd)
+
+            hdus.append(dict(
+                extname=extname,
+                insname=header.get('INSNAME'),
+                arrname=header.get('ARRNAME'),
+                corrname=header.get('CORRNAME'),
+                nrows=nrows,
+                mjd_min=mjd_min, mjd_max=mjd_max,
+            ))
+
+    for h in hdus:
+        h['wavelmin'], h['wavelmax'] = waves.get(h['insname'], (_np.nan,)*2)
+
+    def unique(key):
+        values = [h[key] for h in hdus if h[key] is not None]
+        return sorted(set(values))
+
+    nrows = {}
+    for h in hdus:
+        nrows[h['extname']] = nrows.get(h['extname'], 0) + h['nrows']
+
+    mjd = [h[k] for h in hdus for k in ('mjd_min', 'mjd_max')]
+    wave = [w for minmax in waves.values() for w in minmax]
+
+    summary = dict(
+        filename=filename,
+        version=version,
+        targets=sorted(set(targets)),
+        insnames=unique('insname'),
+        arrnames=unique('arrname'),
+        corrnames=unique('corrname'),
+        nrows=nrows,
+        hdus=hdus,
+    )
+    summary['mjd_min'], summary['mjd_max'] = _minmax(mjd)
+    summary['wavelmin'], summary['wavelmax'] = _minmax(wave)
+
+    return summary
+
+_DATA_EXTNAMES = ('OI_VIS', 'OI_VIS2', 'OI_T3', 'OI_FLUX')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    filename TEXT PRIMARY KEY, mtime REAL, size INTEGER, version INTEGER,
+    mjd_min REAL, mjd_max REAL, wavelmin REAL, wavelmax REAL
+);
+CREATE TABLE IF NOT EXISTS targets (
+    filename TEXT, target TEXT
+);
+CREATE TABLE IF NOT EXISTS hdus (
+    filename TEXT, extname TEXT, insname TEXT, arrname TEXT, 
+    corrname TEXT, nrows INTEGER, mjd_min REAL, mjd_max REAL, 
+    wavelmin REAL, wavelmax REAL
+);
+CREATE INDEX IF NOT EXISTS targets_filename ON targets (filename);
+CREATE INDEX IF NOT EXISTS targets_target ON targets (target);
+CREATE INDEX IF NOT EXISTS hdus_filename ON hdus (filename);
+"""
+
+class Catalog:
+    """
+
+Persistent catalog of OIFITS files, stored in a SQLite database, to 
+find the files containing given targets, instrumental setups, arrays,
+dates, or wavelengths without opening them.
+
+Arguments
+---------
+
+filename (str, optional, default: ':memory:')
+    Name of the SQLite database.  It is created if necessary.
+
+Example
+-------
+
+>>> catalog = Catalog('archive.db')
+>>> catalog.update('/data/oifits')
+>>> filenames = catalog.select(target='CO Ori', insname='GRAVITY_SC')
+>>> data = catalog.openlist(target='CO Ori', mjd_min=57640)
+
+    """
+    def __init__(self, filename=':memory:'):
+        self._db = _sqlite3.connect(filename)
+        self._db.executescript(_SCHEMA)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} at {hex(id(self))} ({len(self)} files)>"
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def update(self, paths, *, workers=None, executor=None, 
+            ignore_errors=False):
+        """
+
+Add files to the catalog, scanning only those that are new or whose
+modification time or size changed.  Files of the catalog that no longer
+exist are removed from it.
+
+Arguments
+---------
+
+paths (str or list of str)
+    File names or directories, see scan().
+
+Keyword arguments
+-----------------
+
+workers, executor, ignore_errors
+    See scan().
+
+Returns
+-------
+
+nfiles (int)
+    Number of files (re)scanned.
+
+        """
+        known = {filename: (mtime, size) for filename, mtime, size in
+                    self._db.execute('SELECT filename, mtime, size FROM files')}
+
+        stats = {}
+        for filename in _find_files(paths):
+            filename = _os.path.abspath(filename)
+            try:
+                stat = _os.stat(filename)
+            except OSError:
+                if ignore_errors:
+                    continue
+                raise
+            stat = (stat.st_mtime, stat.st_size)
+            if known.get(filename) != stat:
+                stats[filename] = stat
+            
+        summaries = scan(list(stats), workers=workers, executor=executor,
+                        ignore_errors=ignore_errors)
+        
+        removed = [f for f in known if not _os.path.exists(f)]
+        
+        with self._db:
+            for filename in [*removed, *stats]:
+                self._remove(filename)
+            for summary in summaries:
+                self._insert(summary, *stats[summary['filename']])
+
+        return len(summaries)
+
+    def _remove(self, filename):
+        
+        for table in ['files', 'targets', 'hdus']:
+            self._db.execute(f"DELETE FROM {table} WHERE filename = ?",
+                    (filename,))
+
+    def _insert(self, summary, mtime, size):
+
+        filename = summary['filename']
+        self._db.execute(
+            'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (filename, mtime, size, summary['version'], 
+             summary['mjd_min'], summary['mjd_max'],
+             summary['wavelmin'], summary['wavelmax']))
+        self._db.executemany(
+            'INSERT INTO targets VALUES (?, ?)',
+            [(filename, target) for target in summary['targets']])
+        self._db.executemany(
+            'INSERT INTO hdus VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(filename, h['extname'], h['insname'], h['arrname'], 
+              h['corrname'], h['nrows'], h['mjd_min'], h['mjd_max'],
+              h['wavelmin'], h['wavelmax']) for h in summary['hdus']])
+
+    def select(self, *, target=None, insname=None, arrname=None, 
+            mjd_min=None, mjd_max=None, wavelmin=None, wavelmax=None):
+        """
+
+Find the files of the catalog containing interferometric data that
+match given criteria.
+
+Keyword arguments
+-----------------
+
+target  (default: all are kept)
+    Target name or list of target names
+
+insname  (default: all are kept)
+    Instrument configuration name or list thereof
+
+arrname  (default: all are kept)
+    Array name or list of array names
+
+mjd_min  (default: -inf)
+    Minimum Modified Julian date
+
+mjd_max  (default: +inf)
+    Maximum Modified Julian date
+
+wavelmin (default: 0)
+    Minimum wavelength
+
+wavelmax (default: +inf)
+    Maximum wavelength
+
+Returns
+-------
+
+filenames (list of str)
+    Files with at least one data table (OI_VIS, OI_VIS2, OI_T3, 
+    OI_FLUX) matching instrument, array, date, and wavelength criteria,
+    and with one of the targets.
+
+        """
+        where = [f"extname IN ({', '.join('?' * len(_DATA_EXTNAMES))})"]
+        values = [*_DATA_EXTNAMES]
+        
+        for name, value in [('insname', insname), ('arrname', arrname)]:
+            if value is not None:
+                value = [str(v) for v in _np.atleast_1d(value)]
+                where.append(f"{name} IN ({', '.join('?' * len(value))})")
+                values += value
+
+        for cond, value in [('mjd_max >= ?', mjd_min), 
+                            ('mjd_min <= ?', mjd_max),
+                            ('wavelmax >= ?', wavelmin), 
+                            ('wavelmin <= ?', wavelmax)]:
+            if value is not None:
+                where.append(cond)
+                values.append(float(value))
+
+        if target is not None:
+            target = [str(t) for t in _np.atleast_1d(target)]
+            where.append('filename IN (SELECT filename FROM targets '
+                         f"WHERE target IN ({', '.join('?' * len(target))}))")
+            values += target
+
+        query = ('SELECT DISTINCT filename FROM hdus WHERE ' 
+                 + ' AND '.join(where) + ' ORDER BY filename')
+        
+        return [filename for filename, in self._db.execute(query, values)]
+
+    def openlist(self, *, target=None, insname=None, arrname=None, 
+            mjd_min=None, mjd_max=None, wavelmin=None, wavelmax=None, 
+            **kwargs):
+        """
+
+Open and merge the files of the catalog matching given criteria.
+
+Keyword arguments
+-----------------
+
+target, insname, arrname, mjd_min, mjd_max, wavelmin, wavelmax
+    Selection criteria, see select().
+
+Other keyword arguments are passed to pyoifits.openlist().
+
+Returns
+-------
+
+hdulist (OIFITS1 or OIFITS2)
+    Merged OIFITS.  Data not matching the criteria are not removed.
+
+        """
+        filenames = self.select(target=target, insname=insname, 
+                        arrname=arrname, mjd_min=mjd_min, mjd_max=mjd_max,
+                        wavelmin=wavelmin, wavelmax=wavelmax)
+        if not filenames:
+            raise ValueError('no file matches the selection criteria')
+
+        return _oifits.openlist(filenames, **kwargs)
@@ -1,6 +1,12 @@
+import astropy
 from astropy.io import fits
 import numpy as np
 import re 
+import copy
+import weakref
+import os
+import gzip
+import builtins
 from collections import OrderedDict 
 
 column_dtype = {
@@ -116,6 +122,179 @@ null (int):
 
     return col
 
+# copy_fits_rec and the copies of OI tables (hdu.table) avoid astropy's
+# constructors by setting private attributes of FITS_rec, Column, and 
+# BinTableHDU.  They only do so for the astropy versions whose internals 
+# they were written for, other versions getting ordinary copies.
+_ASTROPY_VERSION = tuple(int(v) for v in 
+                            re.findall('[0-9]+', astropy.__version__)[:2])
+FAST_COPY = (5, 0) <= _ASTROPY_VERSION < (7, 0)
+
+def copy_fits_rec(data, share=False):
+    """
+Copy a FITS record array without rebuilding its column definitions
+from scratch.
+
+Arguments
+---------
+data (FITS_rec):
+        Table data.
+
+Keyword arguments
+-----------------
+share (bool):
+        If True, the copy is read-only and shares its buffers with data,
+        so that it must be copied again before being written to.  If 
+        False (or data is not contiguous), the buffers are duplicated.
+        Outside of the astropy versions of FAST_COPY, the copy is always
+        made with FITS_rec.copy() and is writeable.
+
+Returns
+-------
+The copy (FITS_rec).
+    """
+
+    # Column renames modify the dtype in place, it can't be shared.
+    dtype = copy.deepcopy(data.dtype)
+
+    if not FAST_COPY:
+        new = data.copy()
+        new.dtype = dtype
+        return new
+
+    # The shared copy is built on a read-only buffer of data.  It cannot
+    # be a view of data, as FITS_rec.field would look up the fields in
+    # data, writeable or not, and the buffer is not viewed as a FITS_rec,
+    # which would rebuild the column definitions from the dtype.
+    if share and data.flags.c_contiguous:
+        buffer = data.view(np.ndarray)
+        buffer = np.lib.stride_tricks.as_strided(buffer, writeable=False)
+        new = np.ndarray.__new__(type(data), data.shape, dtype, buffer)
+        for name in ['_character_as_bytes', '_heapoffset', '_heapsize',
+                     '_nfields', '_gap', '_uint']:
+            setattr(new, name, getattr(data, name))
+        converted = {}
+        for name, array in data._converted.items():
+            array = array.view()
+            array.flags.writeable = False
+            converted[name] = array
+    else:
+        new = np.ndarray.copy(data)
+        new.dtype = dtype
+        converted = {name: array.copy() 
+                        for name, array in data._converted.items()}
+
+    # The copy gets its own column definitions, pointing to it instead
+    # of data, as in FITS_rec.copy, but without reconverting the fields.
+    # (Column.copy shares the listeners of the original column.)
+    new._converted = converted
+    new._col_weakrefs = weakref.WeakSet()
+    coldefs = fits.ColDefs(data._coldefs)
+    for col in coldefs:
+        col._listeners = None
+        col._add_listener(coldefs)
+        del col.array
+        col._parent_fits_rec = weakref.ref(new)
+    new._coldefs = coldefs
+
+    return new
+
+def open_fits_file(filename):
+    """
+Open a FITS file on disk for reading, gzipped or not.
+
+Arguments
+---------
+filename (str):
+        File name.
+
+Returns
+-------
+A binary file object, or None if filename is not the name of a plain or 
+gzipped FITS file (e.g. a file object or a URL).
+    """
+
+    if not isinstance(filename, (str, os.PathLike)):
+        return None
+    if not os.path.isfile(filename):
+        return None
+    with builtins.open(filename, 'rb') as fileobj:
+        magic = fileobj.read(6)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.open(filename, 'rb')
+    if magic == b'SIMPLE':
+        return builtins.open(filename, 'rb')
+    return None
+
+# characters avoided in the encoding of checksums (FITS standard, App. J)
+_CHECKSUM_EXCLUDE = b':;<=>?@[\\]^_`'
+
+def checksum_sum(data, sum32=0):
+    """
+Add bytes to the 32-bit ones' complement sum used by the DATASUM and
+CHECKSUM keywords (FITS standard, Appendix J).
+
+Arguments
+---------
+data (bytes-like):
+        Bytes, completed with zeros if their number is not a multiple
+        of 4 (as are the data of an HDU by their padding).
+sum32 (int, optional, default: 0):
+        Sum of the bytes preceding them, their number being a multiple
+        of 4.
+
+Returns
+-------
+The sum (int) of the preceding bytes and data.
+    """
+
+    data = memoryview(data).cast('B')
+    if len(data) % 4:
+        data = bytes(data) + bytes(-len(data) % 4)
+    words = np.frombuffer(data, dtype='>u4')
+    sum32 = int(sum32) + int(words.sum(dtype=np.uint64))
+    while sum32 >> 32:
+        sum32 = (sum32 & 0xffffffff) + (sum32 >> 32)
+
+    return sum32
+
+def encode_checksum(sum32):
+    """
+Encode the complement of a ones' complement sum as the value of a
+CHECKSUM keyword (FITS standard, Appendix J).
+
+Arguments
+---------
+sum32 (int):
+        Sum of the header (with a CHECKSUM of '0000000000000000') and
+        data of an HDU, see checksum_sum.
+
+Returns
+-------
+The value (str, 16 characters) of the CHECKSUM keyword.
+    """
+
+    value = ~sum32 & 0xffffffff
+    chars = bytearray(16)
+    for i in range(4):
+        byte = (value >> (24 - 8 * i)) & 0xff
+        quotient, remainder = byte // 4 + ord('0'), byte % 4
+        ch = [quotient + remainder, quotient, quotient, quotient]
+        check = True
+        while check:
+            check = False
+            for x in _CHECKSUM_EXCLUDE:
+                for j in [0, 2]:
+                    if ch[j] == x or ch[j + 1] == x:
+                        ch[j] += 1
+                        ch[j + 1] -= 1
+                        check = True
+        for j in range(4):
+            chars[4 * j + i] = ch[j]
+
+    # the characters are rotated by one to the right
+    return (chars[15:] + chars[:15]).decode('ascii')
+
 def merge_columns(*hdus):
 
     # Find all column names keeping order of appearance in hdus
@@ -123,7 +302,8 @@ def merge_columns(*hdus):
     colnames = list(OrderedDict.fromkeys(colnames))
 
     # for each column, find all HDUs it is included and keep the
-    # columns with largest data size.  
+    # columns with largest data size (as given by the format, so that
+    # column data are not loaded).
     columns = []
     for name in colnames:
         col = None
@@ -132,20 +312,101 @@ def merge_columns(*hdus):
                 new_col = hdu.columns[name]
                 if col is None:
                     col = new_col
-                elif col.array.itemsize < new_col.array.itemsize:
+                elif col.dtype.itemsize < new_col.dtype.itemsize:
                     col = new_col
         columns.append(col)
 
     return colnames, columns
 
-def merge_rows(*rows, id_name=None, equality=lambda x,y: x==y):
+def remap(values, map):
+    """
+Replace values found in the keys of a dictionary by the associated 
+values, other values being kept.
+
+Arguments
+---------
+values (array):
+        Values, typically IDs.
+
+map (dict):
+        Dictionary old value -> new value.
+
+Returns
+-------
+A copy of values with the replacements.
+
+All replacements are made at once from the original values, so that
+chained maps such as {1: 2, 2: 3} send 1 to 2 and 2 to 3.
+    """
+
+    values = np.asarray(values)
+    remapped = values.copy()
+    if not map or not values.size:
+        return remapped
+
+    old = np.array(list(map.keys()))
+    new = np.array(list(map.values()))
+
+    # Integer IDs (TARGET_ID, STA_INDEX) span a small range: a dense lookup
+    # table indexed by value is a single gather.
+    if values.dtype.kind in 'iu' and old.dtype.kind in 'iu':
+        vmin = min(values.min(), old.min())
+        vmax = max(values.max(), old.max())
+        size = int(vmax) - int(vmin) + 1
+        if size <= 4 * (values.size + old.size) + 1024:
+            lookup = np.arange(vmin, vmax + 1, dtype=np.int64)
+            lookup[old - vmin] = new
+            return lookup[values - vmin].astype(values.dtype)
+
+    order = np.argsort(old)
+    old, new = old[order], new[order]
+    index = np.searchsorted(old, values).clip(max=len(old) - 1)
+    found = old[index] == values
+    remapped[found] = new[index[found]]
+
+    return remapped
+
+def merge_rows(*rows, id_name=None, equality=lambda x,y: x==y, match=None):
+    """
+Merge sets of table rows, rows of a set duplicating one of the rows
+kept from the previous sets being dropped.
+
+Keyword arguments
+-----------------
+id_name:
+        Name of the ID column that must be kept unique.  If None, all
+        rows are kept.
+equality:
+        Function telling whether two rows are duplicates.
+match:
+        Vectorised alternative to equality.  match(rows2, kept) is given
+        a set of rows and the list of row sets kept so far, and returns
+        for each row the index of its first duplicate among the rows
+        kept (in order), or -1.
+
+Returns
+-------
+The rows kept for each set, and for each set a dictionary mapping the
+old IDs to the new ones when they change.
+    """
 
     if id_name is None:
         return rows, [{}] * len(rows)
 
+    if match is None:
+        def match(rows2, kept):
+            first = []
+            for row2 in rows2:
+                equal = [equality(row2, row1) for rows1 in kept
+                                              for row1 in rows1]
+                index_equal = np.argwhere(equal)
+                first.append(index_equal[0,0] if len(index_equal) else -1)
+            return first
+
     # New unused IDs (in a sequence, avoiding the ones in either
     rows1 = rows[0]
     id1 = rows1[id_name].tolist()
+    used = set(id1)
     kept = [rows1]
     maps = [{}]
 
@@ -154,22 +415,21 @@ def merge_rows(*rows, id_name=None, equality=lambda x,y: x==y):
         id2 = rows2[id_name]
         candidate_id2 = set(range(1, 1 + len(id1) + len(id2)))
         candidate_id2 -= set([*id1, *id2])
-        candidate_id2 = sorted(list(candidate_id2))
+        candidate_id2 = iter(sorted(candidate_id2))
 
         index_map = {}
         kept_lines = []
-        for j, row2 in enumerate(rows2):
+        for j, first in enumerate(match(rows2, kept)):
 
-            equal = [equality(row2, row1) for rows1 in kept for row1 in rows1]
-            index_equal = np.argwhere(equal)
-            if len(index_equal):
-                index_map[id2[j]] = id1[index_equal[0,0]]
+            if first >= 0:
+                index_map[id2[j]] = id1[first]
                 continue
 
             kept_lines.append(j)
-            value = candidate_id2.pop(0) if id2[j] in id1 else id2[j]
+            value = next(candidate_id2) if id2[j] in used else id2[j]
             index_map[id2[j]] = value
             id1.append(value)
+            used.add(value)
 
         kept2 = rows2[kept_lines]
         index_map = {o: n for o, n in index_map.items() if o != n}
@@ -179,25 +439,165 @@ def merge_rows(*rows, id_name=None, equality=lambda x,y: x==y):
 
     return kept, maps
 
+# Keywords of commentary cards, which are kept whatever their number.
+commentary_keywords = {'', 'COMMENT', 'HISTORY'}
+
+class _CardNode:
+
+    # Card of a header being merged, in a circular doubly linked list.
+    # The image and the value of the card are only computed when needed.
+    __slots__ = ['card', 'prev', 'next', 'image', 'value']
+
+    def __init__(self, card=None):
+        self.card = card
+        self.prev = self.next = self
+        self.image = self.value = _CardNode
+
+    def insert_before(self, node):
+        node.prev, node.next = self.prev, self
+        self.prev.next = node
+        self.prev = node
+
+    def unlink(self):
+        self.prev.next = self.next
+        self.next.prev = self.prev
+
+    def get_image(self):
+        if self.image is _CardNode:
+            self.image = self.card.image
+        return self.image
+
+    def get_value(self):
+        if self.value is _CardNode:
+            self.value = self.card.value
+        return self.value
+
+def _is_blank(card):
+    return card is not None and card.keyword == '' and card.is_blank
+
 def merge_fits_headers(*headers, req_keys=[]):
+    """
+Merge FITS headers.
 
-    header = headers[0].copy()
+Arguments
+---------
+headers (Header × N):
+        Headers to merge.
 
-    for h in headers[1:]:
-        for card in h.cards:
-            (name, value, comment) = card
-            if name in ['', 'HISTORY', 'COMMENT']:
-                header.append(card)
-            elif name not in header:
-                if 'HISTORY' in header:
-                    header.insert('HISTORY', card)
+Keyword arguments
+-----------------
+req_keys (list of str):
+        Required keywords, which are kept even if their values differ.
+
+Returns
+-------
+The merged header (new Header).
+
+The cards of the next headers are added in turn to the first one.
+Commentary cards are appended, and keywords not found in the merged
+header are inserted before its first HISTORY card, or else after its 
+last keyword.  If a keyword has a different value, it is set to MULTI if
+its value in the merged header is a string, or else removed unless it
+is required: it is then added back by the next header having it.
+    """
+
+    # Cards are inserted and removed where Header.append, Header.insert,
+    # and Header.remove would put or find them, but in a linked list, as
+    # each of these operations is linear in the size of a Header.  The
+    # first card of each keyword is found in a dictionary, and values are
+    # only parsed when card images differ.
+    head = _CardNode()
+    nodes = {}
+    for card in headers[0].cards:
+        node = _CardNode(card)
+        head.insert_before(node)
+        name = card.keyword.upper()
+        if name not in commentary_keywords:
+            nodes.setdefault(name, []).append(node)
+
+    # Last keyword (after which all cards are commentary), first HISTORY
+    # card, and whether the former comes before the latter.
+    last = head.prev
+    while last is not head and last.card.keyword in commentary_keywords:
+        last = last.prev
+    history = head.next
+    while history is not head and history.card.keyword != 'HISTORY':
+        history = history.next
+    if history is head:
+        history = None
+    last_first = True
+    node = last
+    while history is not None and node is not head:
+        if node is history:
+            last_first = False
+            break
+        node = node.prev
+
+    def use_blanks(card):
+        if _is_blank(head.prev.card):
+            count = len(card.image) // fits.Card.length
+            while count and _is_blank(head.prev.card):
+                head.prev.unlink()
+                count -= 1
+
+    req_keys = set(req_keys)
+    for header in headers[1:]:
+        for card in header.cards:
+            name = card.keyword.upper()
+            if name in commentary_keywords:
+                if _is_blank(card):
+                    head.insert_before(_CardNode(card))
+                    continue
+                node = head
+                while _is_blank(node.prev.card):
+                    node = node.prev
+                new = _CardNode(card)
+                node.insert_before(new)
+                if name == 'HISTORY' and history is None:
+                    history = new
+                    last_first = True
+                use_blanks(card)
+            elif name not in nodes:
+                new = _CardNode(card)
+                if history is not None:
+                    history.insert_before(new)
+                    if last_first:
+                        last = new
                 else:
-                    header.append(card)
-            elif value != header[name]:
-                if type(header[name]) == str:
-                    header[name] = 'MULTI'
+                    last.next.insert_before(new)
+                    last = new
+                nodes[name] = [new]
+                use_blanks(card)
+            else:
+                node = nodes[name][0]
+                image = card.image
+                if image == node.get_image():
+                    continue
+                value = node.get_value()
+                if card.value == value:
+                    continue
+                if type(value) == str:
+                    node.card = copy.copy(node.card)
+                    node.card.value = 'MULTI'
+                    node.image = None
+                    node.value = 'MULTI'
                 elif name not in req_keys:
-                    header.remove(name)
-
-    return header
-
+                    node.unlink()
+                    del nodes[name][0]
+                    if not nodes[name]:
+                        del nodes[name]
+                    if node is last:
+                        last = last.prev
+                        while (last is not head and 
+                               last.card.keyword in commentary_keywords):
+                            if last is history:
+                                last_first = True
+                            last = last.prev
+
+    cards = []
+    node = head.next
+    while node is not head:
+        cards.append(copy.copy(node.card))
+        node = node.next
+
+    return fits.Header(cards)
@@ -11,6 +11,41 @@ from .. import coo as _coo
 
 import numpy as _np
 
+def _match_stations(rows2, kept, *, dist_max):
+
+    # For each station in rows2, index of the first station among the
+    # kept ones with same STA_NAME and TEL_NAME and STAXYZ closer than
+    # dist_max, or -1.  Stations are grouped by name and distances
+    # computed for each group at once.
+    first = _np.full(len(rows2), -1)
+    rows1 = [r for r in kept if len(r)]
+    if not len(rows2) or not rows1:
+        return first
+
+    def get(rows, name):
+        return _np.concatenate([_np.asarray(r[name]) for r in rows])
+
+    def groups(rows):
+        names = zip(_np.char.rstrip(get(rows, 'STA_NAME')).tolist(),
+                    _np.char.rstrip(get(rows, 'TEL_NAME')).tolist())
+        groups = {}
+        for index, name in enumerate(names):
+            groups.setdefault(name, []).append(index)
+        return groups
+
+    xyz1, xyz2 = get(rows1, 'STAXYZ'), get([rows2], 'STAXYZ')
+    groups1 = groups(rows1)
+    for name, index2 in groups([rows2]).items():
+        if (index1 := groups1.get(name)) is None:
+            continue
+        dist = xyz2[index2][:,None,:] - xyz1[index1][None,:,:]
+        close = _np.linalg.norm(dist, axis=-1) <= dist_max
+        found = close.any(axis=1)
+        first[_np.asarray(index2)[found]] = _np.asarray(index1)[
+                                                close[found].argmax(axis=1)]
+
+    return first
+
 class _ArrayHDUBase(_OITableHDU):
 
     def _get_array_field(self, name, shape='none', flatten=False,
@@ -221,23 +256,23 @@ class _ArrayHDU(_MustHaveArrayHDU,_Referenced):
 
     def merge(self, *others):
 
-        norm = _np.linalg.norm
         dist_max = self.get_container()._merge_station_distance
 
-        def eq(x, y):
-            return ((x['STA_NAME'] == y['STA_NAME']) and
-                    (x['TEL_NAME'] == y['TEL_NAME']) and
-                    (norm(x['STAXYZ'] - y['STAXYZ']) <= dist_max))
+        def match(rows2, kept):
+            return _match_stations(rows2, kept, dist_max=dist_max)
         
-        return self._merge_helper(*others, id_name='STA_INDEX', equality=eq)
+        return self._merge_helper(*others, id_name='STA_INDEX', match=match)
+
+    def _merge_key(self):
+
+        header = self.header
+        return (self._EXTNAME, header['ARRNAME'], header['FRAME'])
 
     def __mod__(self, other):
 
         h1, h2 = self.header, other.header
         dist_max = self.get_container()._merge_array_distance
-        return (self & other and
-                h1['ARRNAME'] == h2['ARRNAME'] and
-                h1['FRAME'] == h2['FRAME'] and
+        return (super().__mod__(other) and
                 abs(h1['ARRAYX'] - h2['ARRAYX']) <= dist_max and
                 abs(h1['ARRAYY'] - h2['ARRAYY']) <= dist_max and
                 abs(h1['ARRAYZ'] - h2['ARRAYZ']) <= dist_max)
@@ -2,6 +2,91 @@ from astropy.io.fits.hdu import base as _fitsbase
 from astropy.io import fits as _fits
 from .. import utils as _u
 import copy as _copy
+import threading as _threading
+import contextlib as _contextlib
+
+# OIFITS HDU classes are looked up by (EXTNAME, OI_REVN, CONTENT) instead
+# of being registered to astropy, which would try each class' 
+# match_header() on every HDU read in the process, OIFITS or not.  The
+# lookup replaces astropy's only while OIFITS objects read HDUs (see
+# _oifits_hdu_dispatch), and only in the threads doing so, reads in
+# other threads being left to astropy meanwhile.
+
+_hdu_classes = {}
+_hdu_dispatch = _threading.local()
+_hdu_dispatch_lock = _threading.Lock()
+_hdu_dispatch_count = 0
+_astropy_hdu_class_from_header = None
+
+def _register_hdu(hducls, *, extname=None, oi_revn=None, content=None):
+    _hdu_classes[extname, oi_revn, content] = hducls
+
+def _hdu_class_from_header(cls, header):
+    
+    if getattr(_hdu_dispatch, 'depth', 0) and header:
+        if 'SIMPLE' in header:
+            key = (None, None, header.get('CONTENT', 'OIFITS1'))
+        else:
+            key = (header.get('EXTNAME'), header.get('OI_REVN'), None)
+        hducls = _hdu_classes.get(key)
+        try:
+            if (hducls is not None and issubclass(hducls, cls) and 
+                    hducls.match_header(header)):
+                return hducls
+        except (KeyError, IndexError, NotImplementedError):
+            # malformed header, astropy decides
+            pass
+
+    return _astropy_hdu_class_from_header(cls, header)
+
+@_contextlib.contextmanager
+def _oifits_hdu_dispatch():
+    
+    global _hdu_dispatch_count, _astropy_hdu_class_from_header
+
+    with _hdu_dispatch_lock:
+        if not _hdu_dispatch_count:
+            _astropy_hdu_class_from_header = _fitsbase._hdu_class_from_header
+            _fitsbase._hdu_class_from_header = _hdu_class_from_header
+        _hdu_dispatch_count += 1
+    _hdu_dispatch.depth = getattr(_hdu_dispatch, 'depth', 0) + 1
+
+    try:
+        yield
+    finally:
+        _hdu_dispatch.depth -= 1
+        with _hdu_dispatch_lock:
+            _hdu_dispatch_count -= 1
+            if not _hdu_dispatch_count:
+                _fitsbase._hdu_class_from_header = \
+                                        _astropy_hdu_class_from_header
+
+# OIFITS extensions are ordered by type first
+_EXTNAME_ORDER = {'OI_TARGET': 1, 'OI_ARRAY': 2, 'OI_WAVELENGTH': 3,
+                  'OI_VIS': 4, 'OI_VIS2': 5, 'OI_T3': 6, 'OI_FLUX': 7,
+                  'OI_CORR': 8, 'OI_INSPOL': 9}
+
+def _hdu_sort_key(hdu):
+
+    # A OIFITS primary HDU comes first, then a FITS primary HDU, then
+    # OIFITS extensions, and last other FITS extensions.  OIFITS
+    # extensions are ordered by type, reference names, and date of
+    # observation.  HDUs with equal keys keep their order in a sort, so
+    # that it is reproducible.
+    if isinstance(hdu, _fits.PrimaryHDU):
+        return (0,) if isinstance(hdu, _ValidHDU) else (1,)
+    if not isinstance(hdu, _ValidHDU):
+        return (3,)
+
+    header = hdu.header
+    order = _EXTNAME_ORDER.get(header.get('EXTNAME', ''), 99999)
+    names = [str(header.get(key, ''))
+                for key in ['ARRNAME', 'INSNAME', 'CORRNAME']]
+    mjd = 0.
+    if 'MJD' in hdu.columns.names and hdu.data is not None and len(hdu.data):
+        mjd = float(hdu.data['MJD'].min())
+
+    return (2, order, *names, mjd)
 
 # All Valid HDUs for OIFITS will inherit a _CARDS structured array
 # describing the specific FITS keywords in the header
@@ -60,59 +145,23 @@ and header are copied.
         
         return errors
 
+    # HDUs are compared by sort key (see _hdu_sort_key)
+
     def __ge__(self, other):
 
-        return not self < other
+        return _hdu_sort_key(self) >= _hdu_sort_key(other)
 
     def __gt__(self, other):
 
-        return not self <= other
+        return _hdu_sort_key(self) > _hdu_sort_key(other)
 
     def __lt__(self, other):
     
-        return self is not other and self <= other
+        return _hdu_sort_key(self) < _hdu_sort_key(other)
 
     def __le__(self, other):
 
-        # A OIFITS primary HDU comes first, then a FITS primary HDU,
-        # then an OIFITS extension, and last other FITS extensions.
-        if (isinstance(self, _fits.PrimaryHDU) or
-            not isinstance(other, _ValidHDU)):
-            return True
-        
-        if isinstance(other, _fits.PrimaryHDU):
-            return False
-
-        # OIFITS extensions will be ordered by type first
-        order = {'OI_TARGET': 1, 'OI_ARRAY': 2, 'OI_WAVELENGTH': 3,
-                 'OI_VIS': 4, 'OI_VIS2': 5, 'OI_T3': 6, 'OI_FLUX': 7,
-                 'OI_CORR': 8, 'OI_INSPOL': 9}
-
-        sheader = self.header
-        oheader = other.header
-        sext = sheader.get('EXTNAME', '')
-        oext = oheader.get('EXTNAME', '')
-        sorder = order.get(sext, 99999)
-        oorder = order.get(oext, 99999)
-
-        if sorder != oorder:
-            return sorder < oorder
-
-        # ordering uses reference names, date of observation and, in the
-        # last resort, memory address.
-        
-        arr1 = sheader.get('ARRNAME', '')
-        arr2 = sheader.get('ARRNAME', '')
-        ins1 = sheader.get('INSNAME', '')
-        ins2 = oheader.get('INSNAME', '')
-        corr1 = sheader.get('CORRNAME', '')
-        corr2 = oheader.get('CORRNAME', '')
-        mjd1 = min(getattr(self.data, 'MJD', [0]))
-        mjd2 = min(getattr(other.data, 'MJD', [0]))
-        id1 = id(self)
-        id2 = id(other)
-
-        return (arr1, ins1, corr1, mjd1, id1) <  (arr2, ins2, corr2, mjd2, id2)
+        return _hdu_sort_key(self) <= _hdu_sort_key(other)
 
     def to_version(self, version):
        
@@ -7,7 +7,6 @@ table extensions
 from .table import _OITableHDU, _OITableHDU21
 from .referenced import _Referenced
 from .. import utils as _u
-from scipy import sparse as _sparse
 
 import numpy as _np
 
@@ -71,9 +70,9 @@ class _CorrHDU(_MustHaveCorrHDU,_Referenced):
     def get_corrname(self):
         return self.header['CORRNAME']
 
-    def __mod__(self, other):
+    def _merge_key(self):
 
-        return False
+        return None
 
     def is_referred_to_by(self, other):
         return (not isinstance(other, _CorrHDU) and
@@ -87,7 +86,8 @@ class _CorrHDU(_MustHaveCorrHDU,_Referenced):
 
         # find non-zero elements in the lower triangle, note that
         # indices start at one in OIFITS        
-        iindx, jindx, corr = _sparse.find(corrmatrix)
+        from scipy import sparse
+        iindx, jindx, corr = sparse.find(corrmatrix)
         keep = iindx < jindx
         corr = corr[keep]
         iindx = iindx[keep]
@@ -18,9 +18,11 @@ from numpy import ma as _ma
 import re as _re
 import numpy as _np
 from astropy.time import Time as _Time
-from scipy.spatial.transform import Rotation as _rotation
 from astropy.coordinates import SkyCoord as _SkyCoord
 
+# size of the blocks of rows read from files when selecting columns
+_READ_BLOCK_SIZE = 2**20
+
 class _DataHDU(_OITableHDU):
     
     _CARDS = [
@@ -36,7 +38,8 @@ class _DataHDU(_OITableHDU):
         ('FLAG',      True, 'L',  ('NWAVE',), None,            False, None,
             'Flag for bad quality'),
     ]
-    
+    _SELECTED_COLUMNS = ['TARGET_ID', 'STA_INDEX', 'MJD', 'FLAG']
+
     def get_obs_type(self, name, shape='data', flatten=False):
         """
 
@@ -584,7 +587,7 @@ NotImplemented Error
     def _bin_helper(self, weights):
 
         if weights is None:
-            return self.copy()
+            return self._shared_copy()
 
         colnames = self.columns.names
         obs_names = [n for n in self.get_observable_names() if n in colnames]
@@ -607,6 +610,65 @@ NotImplemented Error
 
         return binned_hdu
 
+    def _select_helper(self, names, fileobj=None, offset=None):
+
+        # columns referring to other tables, needed to sort, or to mask
+        # values are always kept, and so are the ones to_table() needs 
+        # with each kept observable: its error, correlation indices, and
+        # (u, v) coordinates.
+        names = {*names, *self._SELECTED_COLUMNS}
+        errors = dict(zip(self.get_observable_names(), self.get_error_names()))
+        observables = [name for name in names if name in errors]
+        names |= {errors[name] for name in observables}
+        names |= {f"CORRINDX_{name}" for name in names}
+        if observables:
+            names.update(self._get_uvcoord_names())
+
+        # The columns are read from the file when given, unless they are
+        # scaled or of a type (bits, arrays in the heap) that needs
+        # astropy's conversions.
+        new_cols = [c for c in self.columns if c.name in names]
+        if fileobj is not None and all(c.bscale is None and c.bzero is None
+                    and c.format[-1] in 'LABIJKEDCM' for c in new_cols):
+            selected_hdu = self._read_selection(new_cols, fileobj, offset)
+        else:
+            selected_hdu = self.from_columns(new_cols, header=self.header)
+        if hasattr(self, '_container'):
+            selected_hdu._container = self._container
+
+        return selected_hdu
+
+    def _read_selection(self, columns, fileobj, offset):
+
+        # Rows are read by blocks and only the fields of the selected 
+        # columns are kept, so that the table is never held in memory and 
+        # the other columns never decoded.
+        # The columns are described anew, without their arrays, for 
+        # from_columns() not to load the data of the table.
+        nrows = self.header['NAXIS2']
+        attributes = _fits.column.KEYWORD_ATTRIBUTES
+        columns = [_fits.Column(**{a: getattr(c, a) for a in attributes 
+                                    if getattr(c, a) is not None}) 
+                        for c in columns]
+        selected_hdu = self.from_columns(columns, header=self.header, 
+                                         nrows=nrows)
+        # (FITS tables are big-endian)
+        dtype = self.columns.dtype.newbyteorder('>')
+        block = max(1, _READ_BLOCK_SIZE // dtype.itemsize)
+        fields = {col.name: selected_hdu.data[col.name] for col in columns}
+        fileobj.seek(offset)
+        for first in range(0, nrows, block):
+            count = min(block, nrows - first)
+            buffer = fileobj.read(count * dtype.itemsize)
+            rows = _np.frombuffer(buffer, dtype=dtype, count=count)
+            for col in columns:
+                value = rows[col.name]
+                if col.format[-1] == 'L':
+                    value = value == ord('T')
+                fields[col.name][first:first + count] = value
+
+        return selected_hdu
+
 # OIFITS1 Table 
 class _DataHDU1(
         _DataHDU, 
@@ -653,16 +715,17 @@ class _DataHDU2(
 
         colnames = self.columns.names
         obs_names = [n for n in self.get_observable_names() if n in colnames]
-        index = _np.ma.hstack([self.get_corrindx(n, flatten=True) 
-                                                for n in obs_names])
-        index = index[~index.mask]
-        unique = _np.unique(index)
-        if len(unique) < len(index):
-            err_txt = 'repeated CORRINDX'
-            self.run_option(option, err_txt, fixable=False)
-        if _np.any(index <= 0):
-            err_txt = 'negative or null CORRINDX'
-            self.run_option(option, err_txt, fixable=False)
+        if obs_names:
+            index = _np.ma.hstack([self.get_corrindx(n, flatten=True) 
+                                                    for n in obs_names])
+            index = index[~index.mask]
+            unique = _np.unique(index)
+            if len(unique) < len(index):
+                err_txt = 'repeated CORRINDX'
+                self.run_option(option, err_txt, fixable=False)
+            if _np.any(index <= 0):
+                err_txt = 'negative or null CORRINDX'
+                self.run_option(option, err_txt, fixable=False)
 
         # Errors can't be strictly negative
    
@@ -675,9 +738,9 @@ class _DataHDU2(
             if _np.any(invalid):
                 err_txt = f'{name} cannot be strictly negative.'
                 fix_txt = 'replacing by NaN'
-                def fix(h=self): h.data[name][invalid] = _np.nan
+                def fix(h=self): h._own_data()[name][invalid] = _np.nan
                 self.run_option(option, err_txt, fix_txt, fix)
-                self.data[name][invalid] = _np.nan
+                self._own_data()[name][invalid] = _np.nan
  
         return errors
 
@@ -130,14 +130,13 @@ column with its name prefixed with NS_
         if err:
             errors.append(err)
 
-    def __mod__(self, other):
+    def _merge_key(self):
 
-        h1, h2 = self.header, other.header
-
-        return (super().__mod__(other) and
-                h1['CALSTAT'] == h2['CALSTAT'] and
-                h1.get('FOV', 0) == h2.get('FOV', 0) and
-                h1.get('FOVTYPE', '') == h2.get('FOVTYPE', ''))
+        header = self.header
+        return (*super()._merge_key(),
+                header['CALSTAT'],
+                header.get('FOV', 0),
+                header.get('FOVTYPE', ''))
  
 
 class FluxHDU1(
@@ -132,8 +132,8 @@ First revision of the OI_INSPOL binary table, OIFITS v. 2
             'station index in matching OI_ARRAY table'),
     ]
 
-    def __mod__(self, other):
-        return False
+    def _merge_key(self):
+        return None
 
     def get_insname(self, shape='data', flatten=False):
 
@@ -1,4 +1,4 @@
-from .base import _ValidHDU, _OIFITS1HDU, _OIFITS2HDU
+from .base import _ValidHDU, _OIFITS1HDU, _OIFITS2HDU, _register_hdu
 from .. import utils as _u
 
 from astropy.io import fits as _fits
@@ -29,7 +29,9 @@ class _PrimaryHDU(
     def __init_subclass__(cls):
         super().__init_subclass__()
         if hasattr(cls, '_CARDS') and 'CONTENT' in cls._CARDS['name']:
-            _fits.hdu.base._BaseHDU.register_hdu(cls)
+            cards = cls._CARDS
+            content = cards[cards['name'] == 'CONTENT']['default'][0]
+            _register_hdu(cls, content=content)
 
     def to_version(self, n):
         classes = {1: PrimaryHDU1, 2: PrimaryHDU2}
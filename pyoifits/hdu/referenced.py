@@ -33,5 +33,6 @@ OI_WAVELENGTH, OI_CORR)."""
 
             for hdu in self.get_referrers():
                 hdu.header[refkey] = new_name
+            container._reference_index = None
 
         self.header[refkey] = new_name
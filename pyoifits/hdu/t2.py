@@ -14,10 +14,11 @@ class _T2HDU(_DataHDU):
     
     def __getattr__(self, name):
 
+        # (an AttributeError is raised if UCOORD or VCOORD is absent)
         if name == 'U1COORD':
-            return self.data['UCOORD']
+            return self.UCOORD
         if name == 'V1COORD':
-            return self.data['VCOORD']
+            return self.VCOORD
         
         return super().__getattr__(name)
 
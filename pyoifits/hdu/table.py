@@ -1,11 +1,14 @@
 from .. import utils as _u
 from .. import fitsutils as _fu
 
-from .base import _ValidHDU, _OIFITS1HDU, _OIFITS2HDU
+from .base import _ValidHDU, _OIFITS1HDU, _OIFITS2HDU, _register_hdu
 
 from astropy.io import fits as _fits
 import numpy as _np 
 import re as _re
+import hashlib as _hashlib
+import copy as _copy
+from types import MappingProxyType as _MappingProxyType
 
 # All OIFITS tables will inherit a _COLUMNS structured array describing
 # the columns specified in the standard
@@ -35,6 +38,16 @@ class _OITableHDU(
 
     _REFERENCE_KEY = None
 
+    # Lookups of the column descriptions of _COLUMNS, set for each class
+    # when it is created (see _freeze_columns).  Sequences of names are
+    # given for all columns [False] and required columns [True].
+    _OI_COLUMN_DESC = _MappingProxyType({})  # name -> column description
+    _OI_COLNAMES = frozenset()
+    _OI_COLNAME_LIST = _MappingProxyType({False: (), True: ()})
+    _SPEC_COLNAMES = _OI_COLNAME_LIST
+    _OBSERVABLE_NAMES = _OI_COLNAME_LIST
+    _ERROR_NAMES = _OI_COLNAME_LIST
+
     def __init__(self, data=None, header=None, uint=False, ver=None, 
                     character_as_bytes=False):
         _fits.BinTableHDU.__init__(self, data=data, header=header, uint=uint,
@@ -49,7 +62,7 @@ class _OITableHDU(
         header = self.header
         header.set('EXTNAME', self._EXTNAME, 'OIFITS extension name')
 
-        columns = self._get_oi_columns()
+        columns = self._OI_COLUMN_DESC
         comments = header.comments
 
         for index, name in enumerate(self.columns.names, start=1):
@@ -57,9 +70,8 @@ class _OITableHDU(
             ttype = f"TTYPE{index}"
             if not comments[ttype]: 
                 comment = f"name of column {index}"
-                if name in columns['name']:
-                    column = columns[columns['name'] == name][0]
-                    comment = column['comment']
+                if name in columns:
+                    comment = columns[name]['comment']
                 comments[ttype] = comment
            
             tform = f"TFORM{index}"
@@ -75,8 +87,7 @@ class _OITableHDU(
                 comments[tdim] = f"dimension of {name}"
        
         # standard v.2 makes this optional, but it's good practice
-        # isn't it? 
-        self.add_datasum()
+        # isn't it?  (add_checksum also adds DATASUM)
         self.add_checksum()
 
     @classmethod
@@ -126,8 +137,33 @@ Losses may happen because
     def __init_subclass__(cls):
 
         super().__init_subclass__()
+        cls._freeze_columns()
         if getattr(cls, '_EXTNAME', None) and  getattr(cls, '_OI_REVN', None): 
-            _fits.hdu.base._BaseHDU.register_hdu(cls)
+            _register_hdu(cls, extname=cls._EXTNAME, oi_revn=cls._OI_REVN)
+
+    @classmethod
+    def _freeze_columns(cls):
+
+        columns = cls._COLUMNS
+        desc = {}
+        for column in columns:
+            desc.setdefault(column['name'], column)
+        cls._OI_COLUMN_DESC = _MappingProxyType(desc)
+        cls._OI_COLNAMES = frozenset(desc)
+
+        names, spec, obs, err = {}, {}, {}, {}
+        for required in [False, True]:
+            cols = columns[columns['required']] if required else columns
+            names[required] = tuple(c['name'] for c in cols)
+            spec[required] = tuple(c['name'] for c in cols
+                                        if c['shape'] == (_u.NW,))
+            obs[required] = tuple(n for n in spec[required]
+                                        if n[-3:] != 'ERR' and n != 'FLAG')
+            err[required] = tuple(n for n in spec[required] if n[-3:] == 'ERR')
+        cls._OI_COLNAME_LIST = _MappingProxyType(names)
+        cls._SPEC_COLNAMES = _MappingProxyType(spec)
+        cls._OBSERVABLE_NAMES = _MappingProxyType(obs)
+        cls._ERROR_NAMES = _MappingProxyType(err)
  
     @classmethod
     def match_header(cls, header):
@@ -158,33 +194,76 @@ project.
 
         return getattr(other, '_EXTNAME', '') == getattr(self, '_EXTNAME', None)
 
-    def __mod__(self, other):
+    def _merge_key(self):
+        """Tables can only be merged (see __mod__) if they have the same
+key.  None: table cannot be merged."""
 
-        h1, h2 = self.header, other.header
+        header = self.header
+        return (getattr(self, '_EXTNAME', None), 
+                header.get('INSNAME', ''),
+                header.get('ARRNAME', ''),
+                header.get('CORRNAME', ''))
 
-        return (self & other and
-                h1.get('INSNAME', '') == h2.get('INSNAME', '') and
-                h1.get('ARRNAME', '') == h2.get('ARRNAME', '') and
-                h1.get('CORRNAME', '') == h2.get('CORRNAME', ''))
+    def __mod__(self, other):
+
+        key = self._merge_key()
+        other_key = getattr(other, '_merge_key', lambda: None)()
+        return key is not None and key == other_key
  
     def _xmatch(self, refhdu, refname, *, name=None, concatenate=False):
         """Helper to find target or array properties from indices"""
-       
-        ref_indices = getattr(refhdu, refname)
-        if name is None:
-            ref_values = list(range(len(ref_indices))) 
-        else:
-            ref_values = getattr(refhdu, name)
-        xmatch = dict(zip(ref_indices, ref_values))
-        indices = getattr(self, refname)
-        shape = indices.shape + _np.shape(ref_values[0])
-        values = _np.reshape([xmatch[i] for i in indices.flatten()], shape)
-      
-        if concatenate:
-            values = [_np.atleast_1d(a) for a in values]
-            values = ['-'.join([str(x) for x in a]) for a in values]
 
-        return values
+        rows = self._xmatch_rows(refhdu, refname)
+        if name is None:
+            return rows
+
+        ref_values = getattr(refhdu, name)
+        if not concatenate:
+            values = _np.asarray(ref_values)[rows]
+            return values.astype(values.dtype.newbyteorder('='), copy=False)
+
+        # configurations are joined once per distinct set of rows, each
+        # set being encoded as one integer in base len(ref_values)
+        rows = rows.reshape(len(rows), -1)
+        base = max(len(ref_values), 1) ** _np.arange(rows.shape[1])
+        _, first, inverse = _np.unique(rows @ base, return_index=True,
+                                       return_inverse=True)
+        configs = ['-'.join([str(ref_values[i]) for i in rows[k]])
+                                                    for k in first]
+        values = _np.array(configs, dtype=object)[inverse]
+
+        return values.tolist()
+
+    def _xmatch_rows(self, refhdu, refname):
+
+        # Rows of the reference table matching the indices, found in the
+        # sorted indices of the reference table (the last one if repeated).
+        # They are cached for each reference table until the data of either
+        # table are replaced or about to be modified (see _own_data and
+        # _set_data), and the cache keeps the data alive so that their
+        # ids are not reused.
+        token = (self.__dict__.get('_data_version', 0),
+                 refhdu.__dict__.get('_data_version', 0),
+                 id(self.data), id(refhdu.data))
+        cache = self.__dict__.setdefault('_xmatch_cache', {})
+        cached = cache.get((id(refhdu), refname))
+        if cached is not None and cached[0] is refhdu and cached[1] == token:
+            return cached[2]
+
+        ref_indices = _np.asarray(getattr(refhdu, refname))
+        indices = _np.asarray(getattr(self, refname))
+        order = _np.argsort(ref_indices, kind='stable')
+        sorted_indices = ref_indices[order]
+        pos = _np.searchsorted(sorted_indices, indices, side='right') - 1
+        found = pos >= 0
+        found[found] = sorted_indices[pos[found]] == indices[found]
+        if not found.all():
+            raise KeyError(indices[~found].flat[0])
+        rows = order[pos]
+
+        cache[(id(refhdu), refname)] = (refhdu, token, rows,
+                                        self.data, refhdu.data)
+        return rows
 
     def data_shape(self):
 
@@ -308,7 +387,8 @@ Syntax: tab.rename_columns(oldname1=newname1, ...)
                     if fixable:
                         try:
                             default = _np.array(default, dtype=dtype)
-                            def fix(): values[invalid] = default
+                            def fix(h=self, name=name, default=default):
+                                h._own_data()[name][invalid] = default
                         except:
                             fixable = False
                     if not fixable:
@@ -342,15 +422,14 @@ Syntax: tab.rename_columns(oldname1=newname1, ...)
     @classmethod
     def _fix_column_types(cls, columns):
 
-        oi_columns = cls._get_oi_columns(required=False)
+        oi_columns = cls._OI_COLUMN_DESC
         new_columns = []
 
         for col in columns:
 
-            coldesc = oi_columns[oi_columns['name'] == col.name]
+            coldesc = oi_columns.get(col.name)
 
-            if len(coldesc):
-                coldesc = coldesc[0]
+            if coldesc is not None:
                 try:
                     col = _fu.ascolumn(col, name=coldesc['name'],
                         unit=coldesc['unit'], format=coldesc['format'])
@@ -389,8 +468,7 @@ the standard.
     # Quick access to OICOLUMNS with hdu.VI2DATA, etc.
     def __getattr__(self, s):
       
-        oicolnames = self._get_oi_colnames() 
-        if s in oicolnames and s in self.columns.names:
+        if s in type(self)._OI_COLNAMES and s in self.columns.names:
             return self.data[s][...]
         
         clsname = type(self).__name__
@@ -399,18 +477,114 @@ the standard.
 
     def __setattr__(self, s, v):
 
-        oicolnames = self._get_oi_colnames()
-        if s in oicolnames and s in self.columns.names:
-            self.data[s] = v
+        if s in type(self)._OI_COLNAMES and s in self.columns.names:
+            self._own_data()[s] = v
         else:
             self.__dict__[s] = v
 
+    def copy(self):
+        """
+
+Create a duplicate of an OIFITS table, with data and header copied.
+
+        """
+        if self.data is None:
+            return super().copy()
+        return self._clone(_fu.copy_fits_rec(self.data))
+
+    # Copy-on-write.  A shared copy has its own header but read-only data 
+    # sharing the buffers of the original table.  Before modifying the data
+    # in place, pyoifits calls _own_data() to get a private copy.  There is
+    # no such protection in the other direction: changes made in place to
+    # the original are seen by its shared copies, which are therefore only
+    # used within a pyoifits call and given a private copy before being
+    # returned (see oifits._own_shared_data).
+
+    def _shared_copy(self):
+        if self.data is None:
+            return super().copy()
+        return self._clone(_fu.copy_fits_rec(self.data, share=True))
+
+    def _own_data(self):
+        data = self.data
+        if data is not None and not data.flags.writeable:
+            data = _fu.copy_fits_rec(data)
+            self._set_data(data)
+        # the data are about to be modified (see _xmatch_rows)
+        state = self.__dict__
+        state['_data_version'] = state.get('_data_version', 0) + 1
+        return data
+
+    def _clone(self, data, keep_header=False):
+
+        # Tables read from a file have their header rewritten by astropy
+        # when built from data, unless keep_header is set.  The HDU state
+        # is only duplicated for the astropy versions it was written for
+        # (fitsutils.FAST_COPY).
+        if not _fu.FAST_COPY or (not self._new and not keep_header):
+            cp = type(self)(data=data, header=self._header.copy())
+            if hasattr(self, '_container'):
+                cp._container = self._container
+            return cp
+
+        # Otherwise, table initialisation and update (checksum) dominate
+        # the cost of a copy, so that the HDU is duplicated instead, with 
+        # the state of a new HDU.
+        cp = _copy.copy(self)
+        state = cp.__dict__
+        for name in ['_theap', '_fingerprint_cache', '_xmatch_cache']:
+            state.pop(name, None)
+        state.update(_header=self._header.copy(), _header_str=None,
+            _file=None, _buffer=None, _header_offset=None, _data_offset=None,
+            _data_size=None, _new=True, _data_replaced=False,
+            _checksum=None, _checksum_valid=None, _datasum=None,
+            _datasum_valid=None)
+        cp._set_data(data)
+        return cp
+
+    def _set_data(self, data):
+        state = self.__dict__
+        if not _fu.FAST_COPY:
+            # (self.data = data would bypass astropy's setter, which 
+            # updates the columns, see __setattr__)
+            type(self).data.__set__(self, data)
+        else:
+            state['data'] = data
+            state['columns'] = data._coldefs
+            data._coldefs._add_listener(data)
+        state.pop('_fingerprint_cache', None)
+        # the data are replaced (see _xmatch_rows)
+        state['_data_version'] = state.get('_data_version', 0) + 1
+        
+    def _prewriteto(self, checksum=False, inplace=False):
+        # the converted columns (FLAG, etc.) are written back to the data
+        self._own_data()
+        return super()._prewriteto(checksum=checksum, inplace=inplace)
+
+    def _calculate_datasum(self):
+        # native data are byteswapped in place for the computation
+        if self.data is not None and self.data.dtype.isnative:
+            self._own_data()
+        return super()._calculate_datasum()
+
     def zero(self):
 
         newhdu = self.copy()
         for name in self._get_spec_colnames():
             newhdu.data[name][...] = 0
         return newhdu
+
+    def _native_endian_helper(self):
+
+        # Tables read from files are big-endian.  New tables built from
+        # the columns are native and byteswapped by astropy when written.
+        if self.data is None or self.data.dtype.isnative:
+            return self
+        data = _fits.FITS_rec.from_columns(self.columns)
+        newhdu = type(self)(data=data, header=self.header)
+        if hasattr(self, '_container'):
+            newhdu._container = self._container
+        return newhdu
     
     def _diminfo(self):
         
@@ -470,6 +644,8 @@ the standard.
     
     @classmethod
     def _get_oi_colnames(cls, required=False, condition=None):
+        if condition is None:
+            return list(cls._OI_COLNAME_LIST[bool(required)])
         cols = cls._get_oi_columns(required, condition)
         names = [c[0] for c in cols]
         return names
@@ -480,25 +656,26 @@ the standard.
     
     @classmethod
     def get_error_names(cls, required=False):
-        cols = cls._get_spec_colnames(required)
-        return [c for c in cols if c[-3:] == 'ERR']
+        return list(cls._ERROR_NAMES[bool(required)])
 
     @classmethod
     def get_observable_names(cls, required=False):
-        cols = cls._get_spec_colnames(required)
-        return [c for c in cols if c[-3:] != 'ERR' and c != 'FLAG']
+        return list(cls._OBSERVABLE_NAMES[bool(required)])
 
     @classmethod
     def _get_spec_colnames(cls, required=False):
-        cols = cls._get_spec_columns(required)
-        return [c[0] for c in cols]
+        return list(cls._SPEC_COLNAMES[bool(required)])
 
     def merge(self, *others):
         return self._merge_helper(*others)
 
-    def _merge_helper(self, *others, id_name=None, equality=lambda a, b: None):
+    def _merge_helper(self, *others, id_name=None, equality=lambda a, b: None,
+            match=None, headers=None):
         """Merge a set of OIFITS tables of the same kind.  id_name: column
 ID that must be kept unique. equality: criteria to discard redundant rows.
+match: vectorised alternative to equality (see fitsutils.merge_rows).
+headers: headers to merge instead of the tables' ones, when the tables
+are partial merges of tables with these headers.
         """
 
         # Check we are merging the same type of extension 
@@ -523,44 +700,62 @@ ID that must be kept unique. equality: criteria to discard redundant rows.
         # * For each set a map of old_id -> new_id is built to avoid
         #   duplicate IDs.
         rows = [hdu.data for hdu in hdus]
-        rows, maps = _fu.merge_rows(*rows, id_name=id_name, equality=equality)
+        rows, maps = _fu.merge_rows(*rows, id_name=id_name, equality=equality,
+                        match=match)
         nrows = sum(len(r) for r in rows)
 
         # Merge headers.  
-        headers = [hdu.header for hdu in hdus]
+        if headers is None:
+            headers = [hdu.header for hdu in hdus]
         req_keys = cls._CARDS['name'][cls._CARDS['required']]
         header = _fu.merge_fits_headers(*headers, req_keys=req_keys)
         
-        # Create an empty merged fits with the right number of rows,
-        # then fill it.
+        # Build each merged column with a single concatenation of the 
+        # sets, or if some sets lack it, by filling an array of zeros.
+        # The table (header, checksums) is then created once. 
         #
         # FIXME null values!
         #
-        
-        merged = cls.from_columns(columns, nrows=nrows, fill=1, header=header)
-        
-        rowmin = 0
-        for i, (data, map) in enumerate(zip(rows, maps)):
-        
-            ndata = len(data)
-            rowmax = rowmin + ndata
+        merged_columns = []
+        for col in columns:
+            
+            name = col.name
+            values = []
+            for data, map in zip(rows, maps):
+                value = None
+                if name in data.names:
+                    value = data[name]
+                    if map and name == id_name:
+                        value = _fu.remap(value, map)
+                values.append(value)
+            
+            present = [v for v in values if v is not None]
+            if len(present) == len(values):
+                array = _np.concatenate(values)
+            else:
+                shape = (nrows, *present[0].shape[1:])
+                array = _np.zeros(shape, dtype=_np.result_type(*present))
+                rowmin = 0
+                for data, value in zip(rows, values):
+                    rowmax = rowmin + len(data)
+                    if value is not None:
+                        array[rowmin:rowmax] = value
+                    rowmin = rowmax
+            
+            merged_columns.append(_fits.Column(name=name, format=col.format,
+                unit=col.unit, dim=col.dim, null=col.null, disp=col.disp,
+                array=array))
 
-            for name in data.names:
-                if map and name == id_name:
-                    values = [map.get(i, i) for i in data[name]]
-                else:
-                    values = data[name]
-                merged.data[name][rowmin:rowmax][...] = values 
-            rowmin += ndata
+        merged = cls.from_columns(merged_columns, header=header)
 
-        # Update in HDUs refering to other
+        # Update in HDUs refering to other, all IDs at once so that chained
+        # renumbering (e.g. 1 -> 2 and 2 -> 3) doesn't collide.
         for hdu, map in zip(hdus, maps):
             if map and (container := getattr(hdu, '_container', None)):
                 for h in container.get_OITableHDUs():
                     if h.refers_to(hdu): 
-                        field = h.data[id_name]
-                        for old, new in map.items():
-                            field[field == old] = new
+                        field = h._own_data()[id_name]
+                        field[...] = _fu.remap(field, map)
         
         return merged 
 
@@ -586,9 +781,33 @@ ID that must be kept unique. equality: criteria to discard redundant rows.
                 header1.get('INSNAME', '') == header2.get('INSNAME', '') and
                 header1.get('ARRNAME', '') == header2.get('ARRNAME', '') and
                 header1.get('CORRNAME', '') == header2.get('CORRNAME', '') and
-                len(data1) == len(data2) and 
+                len(data1) == len(data2) and
                 data1.dtype == data2.dtype and
-                (data1 == data2).all())
+                (data1.view(_np.ndarray) == data2.view(_np.ndarray)).all())
+
+    def _fingerprint(self):
+
+        # Hash of what __eq__ compares: equal tables have the same
+        # fingerprint, so that duplicates are looked for among tables
+        # sharing a fingerprint only.  It is cached, and recomputed if
+        # the data array or reference keywords are replaced, but not if
+        # the data are modified in place.
+        header = self.header
+        keys = (header['EXTNAME'], header.get('INSNAME', ''),
+                header.get('ARRNAME', ''), header.get('CORRNAME', ''))
+        data = self.data
+        token = (keys, id(data))
+        cached = self.__dict__.get('_fingerprint_cache')
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        digest = _hashlib.blake2b(repr(keys).encode(), digest_size=16)
+        if data is not None:
+            raw = data.view(_np.ndarray)
+            digest.update(str(raw.dtype.descr).encode())
+            digest.update(_np.ascontiguousarray(raw).view(_np.uint8))
+        fingerprint = digest.hexdigest()
+        self.__dict__['_fingerprint_cache'] = (token, fingerprint, data)
+        return fingerprint
 
     @classmethod
     def _get_column_shape(cls, **columns):
@@ -6,7 +6,7 @@ from .table import _OITableHDU, _OITableHDU11, _OITableHDU22
 from .. import utils as _u
 
 import numpy as _np
-from astroquery.simbad import Simbad as _Simbad
+import itertools as _itertools
 from astropy.coordinates import SkyCoord as _SkyCoord
 from astropy import units as _units
 from astropy.time import Time as _Time
@@ -20,6 +20,56 @@ def _decode(s):
         return s.decode()
     return s
 
+def _match_targets(rows2, kept, *, dist_max, name_match):
+
+    # For each target in rows2, index of the first target among the kept 
+    # ones with |ΔRA|, |ΔDEC| <= dist_max, same EQUINOX (unless dist_max
+    # > 360) and same name (if name_match) or -1. Candidates are found 
+    # with a KD-tree using the maximum norm.
+    from scipy.spatial import cKDTree
+
+    first = _np.full(len(rows2), -1)
+    rows1 = [r for r in kept if len(r)]
+    if not len(rows2) or not rows1:
+        return first
+
+    def get(rows, name):
+        return _np.concatenate([_np.asarray(r[name]) for r in rows])
+
+    pos1 = _np.stack([get(rows1, 'RAEP0'), get(rows1, 'DECEP0')], axis=-1)
+    pos2 = _np.stack([get([rows2], 'RAEP0'), get([rows2], 'DECEP0')], axis=-1)
+    valid1 = _np.isfinite(pos1).all(axis=-1)
+    valid2 = _np.isfinite(pos2).all(axis=-1)
+    index1 = _np.argwhere(valid1)[:,0]
+    index2 = _np.argwhere(valid2)[:,0]
+    if not len(index1) or not len(index2):
+        return first
+
+    tree = cKDTree(pos1[index1])
+    candidates = tree.query_ball_point(pos2[index2], r=dist_max, p=_np.inf)
+    ncand = [len(c) for c in candidates]
+    i2 = _np.repeat(index2, ncand)
+    i1 = index1[_np.fromiter(_itertools.chain(*candidates), dtype=int,
+                    count=sum(ncand))]
+
+    keep = _np.ones(len(i1), dtype=bool)
+    if dist_max <= 360:
+        equinox1, equinox2 = get(rows1, 'EQUINOX'), get([rows2], 'EQUINOX')
+        keep &= equinox1[i1] == equinox2[i2]
+    if name_match:
+        name1 = _np.char.rstrip(get(rows1, 'TARGET'))
+        name2 = _np.char.rstrip(get([rows2], 'TARGET'))
+        keep &= name1[i1] == name2[i2]
+    i1, i2 = i1[keep], i2[keep]
+
+    # first match for each target
+    nkept = len(pos1)
+    best = _np.full(len(rows2), nkept)
+    _np.minimum.at(best, i2, i1)
+    first[best < nkept] = best[best < nkept]
+    
+    return first
+
 class _MustHaveTargetHDU(_OITableHDU):
 
     def _get_target_field(self, name, shape='none', flatten=False,
@@ -370,9 +420,9 @@ class _TargetHDU(_MustHaveTargetHDU):
 
         return self._merge_helper(other)
 
-    def __mod__(self, other):
+    def _merge_key(self):
         
-        return self & other
+        return (self._EXTNAME,)
                
     def is_referred_to_by(self, other):
         return (not isinstance(other, _TargetHDU) and
@@ -384,13 +434,11 @@ class _TargetHDU(_MustHaveTargetHDU):
         dist_max = container._merge_target_distance
         name_match = container._merge_target_name_match
  
-        def eq(x, y):
-            return ((not name_match or x['TARGET'] == y['TARGET']) and
-                    (dist_max > 360 or x['EQUINOX'] == y['EQUINOX']) and
-                    abs(x['RAEP0'] - y['RAEP0']) <= dist_max and
-                    abs(x['DECEP0'] - y['DECEP0']) <= dist_max)
+        def match(rows2, kept):
+            return _match_targets(rows2, kept, dist_max=dist_max, 
+                        name_match=name_match)
                  
-        return self._merge_helper(*others, id_name='TARGET_ID', equality=eq)
+        return self._merge_helper(*others, id_name='TARGET_ID', match=match)
 
     def _trim_helper(self, *, target_filter=lambda targ: True, 
             wave_filter=None, insname_filter=None, keep_ns_columns=False):
@@ -541,7 +589,8 @@ column with its name prefixed with NS_
 
         """
 
-        simbad = _Simbad()
+        from astroquery.simbad import Simbad
+        simbad = Simbad()
         simbad.remove_votable_fields(*simbad.get_votable_fields()[1:])
         # OIFITS standard imposes equinox = epoch for the frame which
         # de facto excludes ICRS, we use FK5.
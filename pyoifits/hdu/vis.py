@@ -222,6 +222,8 @@ Second revision of the OI_VIS binary table, OIFITS v. 2.
         amptyp = self.header.get('AMPTYP', 'absolute')
         
         for name in ['VISAMP', 'VISAMPERR']:
+            if name not in self.columns.names:
+                continue
             column = self.columns[name]
             if amptyp == 'correlated flux':
                 if column.unit is None:
@@ -238,14 +240,13 @@ Second revision of the OI_VIS binary table, OIFITS v. 2.
         
         return errors
 
-    def __mod__(self, other):
+    def _merge_key(self):
 
-        h1, h2 = self.header, other.header
-
-        return (super().__mod__(other) and
-                h1.get('AMPTYP', '') == h2.get('AMPTYP', '') and
-                h1.get('PHITYP', '') == h2.get('PHITYP', '') and
-                h1.get('AMPORDER', 0) == h2.get('AMPORDER', 0) and
-                h1.get('PHIORDER', 0) == h2.get('PHIORDER', 0))
+        header = self.header
+        return (*super()._merge_key(),
+                header.get('AMPTYP', ''),
+                header.get('PHITYP', ''),
+                header.get('AMPORDER', 0),
+                header.get('PHIORDER', 0))
         
 new_vis_hdu = _VisHDU.from_data
@@ -76,9 +76,9 @@ class _WavelengthHDU(_MustHaveWavelengthHDU,_Referenced):
                 isinstance(other, _MustHaveWavelengthHDU) and
                 self.get_insname() == other.get_insname())
 
-    def __mod__(self, other):
+    def _merge_key(self):
 
-        return False
+        return None
 
     def rename(self, new_name):
 
@@ -90,8 +90,8 @@ class _WavelengthHDU(_MustHaveWavelengthHDU,_Referenced):
             return
 
         for h in container.get_inspolHDUs():
-            to_rename = h.data['INSNAME'] == oldname
-            h.data['INSNAME'][to_rename][...] = new_name
+            to_rename = h.data['INSNAME'] == old_name
+            h._own_data()['INSNAME'][to_rename] = new_name
 
     @classmethod
     def from_data(cls, *, insname, version=2, eff_wave, eff_band=0., 
@@ -190,7 +190,7 @@ column with its name prefixed with NS_
 
         else:
             
-            new = self.copy()
+            new = self._shared_copy()
             weights = None
 
         return new, weights
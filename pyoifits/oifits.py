@@ -3,10 +3,12 @@ from astropy import table as _table
 from astropy.time import Time as _Time
 from numpy import ma as _ma
 import numpy as _np
-import scipy.sparse as _sparse
 import re as _re 
-
-from matplotlib import pylab as _plt
+import time as _time
+import functools as _functools
+import collections as _collections
+import itertools as _itertools
+from concurrent import futures as _futures
 
 # TEMP
 import warnings
@@ -18,7 +20,7 @@ from .hdu import *
 from . import utils as _u
 from . import fitsutils as _fu
 
-from .hdu.base import _ValidHDU
+from .hdu.base import _ValidHDU, _oifits_hdu_dispatch, _hdu_sort_key
 from .hdu.table import _OITableHDU
 from .hdu.data import _DataHDU
 from .hdu.target import _TargetHDU
@@ -34,7 +36,8 @@ from .hdu.inspol import _InspolHDU
 from .hdu.primary import _PrimaryHDU
 
 
-def open(filename, mode='readonly', lazy_load_hdus=True, **kwargs):
+def open(filename, mode='readonly', lazy_load_hdus=True, columns=None, 
+        native_endian=False, **kwargs):
     """
 
 Open an OIFITS file.
@@ -48,22 +51,57 @@ mode (str, optional, default: 'readonly')
     Read mode
 lazy_load_hdus (bool, optional, default: True)
     Whether to only load HDUs if needed
+columns (str or list of str, optional, default: None)
+    Columns to keep in interferometric data tables (OI_VIS, OI_VIS2, 
+    OI_T3, OI_FLUX).  TARGET_ID, STA_INDEX, MJD, FLAG, and the error,
+    CORRINDX, and (u, v) coordinates of kept observables are always 
+    kept, so that to_table() can be used.  Other columns are dropped 
+    and all HDUs are loaded.  For files on disk, plain or gzipped, the 
+    rows are read by blocks and only the kept columns stored, though
+    whole rows are read from the file.  If None, all columns are kept.
+native_endian (bool, optional, default: False)
+    Whether OI tables are converted once and for all to the native byte
+    order, instead of the big-endian order of FITS files.  Numerical 
+    operations are faster.  The conversion back is done when writing.
+    All HDUs are loaded and data are copied into memory.
 
     """
-    # we need to read the primary HDU to see which FITS version it is
-    if mode == 'ostream':
-        cls = OIFITS2
+    # The primary HDU is always read, even when HDUs are lazy-loaded.
+    # It tells which OIFITS version the file is, and the class of the 
+    # HDU list is set accordingly, without opening the file twice.
+    hdulist = _OIFITS.fromfile(filename, mode=mode, lazy_load_hdus=True, 
+                                **kwargs)
+    if list.__len__(hdulist): # len(h) would load all HDUs
+        content = hdulist[0].header.get('CONTENT', '')
+        cls = OIFITS2 if content == 'OIFITS2' else OIFITS1
     else:
-        with _fits.open(filename, lazy_load_hdus=True) as hdulist:
-            if list.__len__(hdulist): # len(h) would load all HDUs
-                content = hdulist[0].header.get('CONTENT', '')
-                cls = OIFITS2 if content == 'OIFITS2' else OIFITS1
-            else:
-                cls = OIFITS2
-    hdus = cls.fromfile(filename, lazy_load_hdus=lazy_load_hdus, **kwargs)
-    return hdus
+        cls = OIFITS2
+    hdulist.__class__ = cls
+    if not lazy_load_hdus or columns is not None or native_endian:
+        hdulist.readall()
+    if columns is not None:
+        if isinstance(columns, str):
+            columns = [columns]
+        # The selected columns of files on disk are read from the file,
+        # instead of loading the data tables.
+        fileobj = _fu.open_fits_file(filename)
+        try:
+            for index, hdu in enumerate(hdulist):
+                if isinstance(hdu, _DataHDU):
+                    offset = hdulist.fileinfo(index)['datLoc']
+                    hdulist[index] = hdu._select_helper(columns, 
+                                        fileobj=fileobj, offset=offset)
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+    if native_endian:
+        for index, hdu in enumerate(hdulist):
+            if isinstance(hdu, _OITableHDU):
+                hdulist[index] = hdu._native_endian_helper()
+    return hdulist
 
-def openlist(filenames):
+def openlist(filenames, *, columns=None, native_endian=False, memmap=None, 
+        workers=None, executor=None, timings=None):
     """
 
 Open a list of OIFITS files and merge them.
@@ -74,13 +112,190 @@ Arguments
 filenames (str × N)
     File names
 
+Keyword arguments
+-----------------
+
+columns (str or list of str, optional, default: None)
+    Columns to keep in interferometric data tables, see open().
+native_endian (bool, optional, default: False)
+    Whether OI tables are converted to the native byte order, see open().
+memmap (bool, optional, default: None)
+    Whether the data are memory-mapped.  If None, astropy's default 
+    is used (astropy.io.fits.Conf.use_memmap).  Tables that are not 
+    merged with others, such as OI_WAVELENGTH, stay backed by the
+    files and are only loaded into memory when accessed.  Writes are
+    copy-on-write and never reach the files.  It has no effect if
+    files are read in another process (see executor).
+workers (int, optional, default: None)
+    Number of threads reading and parsing the files concurrently.
+executor (concurrent.futures.Executor, optional, default: None)
+    Executor reading and parsing the files concurrently, for instance
+    a ProcessPoolExecutor.  It cannot be used together with workers. 
+timings (dict, optional, default: None)
+    If given, it is filled with the time (s) spent reading and parsing 
+    each file.
+
+Files are merged in the order they are given, whatever the order in 
+which they are read.
+
     """
-    hdulists = [open(f, lazy_load_hdus=False) for f in filenames]
+    # HDUs cannot be pickled, so they are sent back from other processes 
+    # as (class, data, header) 
+    portable = (executor is not None and
+                    not isinstance(executor, _futures.ThreadPoolExecutor))
+    read = _functools.partial(_read_for_merge, columns=columns, 
+                    native_endian=native_endian, memmap=memmap, 
+                    portable=portable)
+    results = _u.executor_map(read, filenames, 
+                    workers=workers, executor=executor)
+
+    if timings is not None:
+        timings.update((f, t) for f, (h, t) in zip(filenames, results))
+
+    hdulists = [h for h, t in results]
+    if portable:
+        hdulists = [_from_portable(h) for h in hdulists]
+
     hdulist = _merge(*hdulists, _inplace=True)
 
     return hdulist
 
-def merge(*hdulists):
+def _read_for_merge(filename, columns=None, native_endian=False, 
+        memmap=None, portable=False):
+
+    start = _time.perf_counter()
+
+    # readonly memory maps are copy-on-write
+    hdulist = open(filename, lazy_load_hdus=False, columns=columns, 
+                   native_endian=native_endian, memmap=memmap)
+    for hdu in hdulist:
+        hdu.data
+    if portable:
+        with hdulist:
+            hdulist = _to_portable(hdulist)
+    
+    return hdulist, _time.perf_counter() - start
+
+def _to_portable(hdulist):
+    
+    hdus = [_hdu_to_portable(hdu) for hdu in hdulist]
+    return type(hdulist), hdus
+
+def _from_portable(portable):
+
+    cls, hdus = portable
+    return cls([_hdu_from_portable(hdu) for hdu in hdus])
+
+def _hdu_to_portable(hdu, rebuild=False):
+
+    # Columns of copied FITS_rec hold weak references and cannot be 
+    # pickled, data rebuilt from new columns can.
+    data = hdu.data
+    if rebuild and data is not None:
+        columns = [_fits.Column(name=col.name, format=col.format, 
+                        unit=col.unit, dim=col.dim, null=col.null, 
+                        disp=col.disp, array=data[col.name])
+                    for col in hdu.columns]
+        data = _fits.FITS_rec.from_columns(columns)
+    return type(hdu), data, hdu.header
+
+def _hdu_from_portable(portable):
+    
+    # unpickled FITS_rec don't keep track of column renames, copies do.
+    hducls, data, header = portable
+    return hducls(data=None if data is None else data.copy(), header=header)
+
+def iter_tables(filenames, *, correlations=None, remove_masked=False,
+        prefetch=False, **kwargs):
+    """
+
+Iterate over OIFITS files, converting each one to a flat table 
+containing one scalar interferometric observable per line.  Files are 
+opened one at a time and closed before the next one is processed, so
+that memory use does not depend on the number of files.
+
+Arguments
+---------
+
+filenames (str × N)
+    File names
+
+Keyword arguments
+-----------------
+
+correlations (str, optional, default: None)
+    Type of correlation matrix, see OIFITS2.to_table().  If given, the
+    correlation matrix of each file is returned.
+remove_masked (bool, default: False)
+    Remove masked values.
+prefetch (bool, optional, default: False)
+    Whether the next file is read and converted in a background thread
+    while the current table is being used.
+
+Other keyword arguments (observable, observable_type, target, insname,
+arrname, mjd_min, mjd_max, wavelmin, wavelmax) select the data to be 
+kept, see OIFITS2.to_table().
+
+Yields
+------
+
+filename (str)
+    File name
+tab (astropy.table.Table)
+    A table with one scalar observable per line.
+corr (optional)
+    Correlation matrix, only if correlations is given.
+
+    """
+    read = _functools.partial(_read_table, correlations=correlations,
+                remove_masked=remove_masked, **kwargs)
+
+    if not prefetch:
+        for filename in filenames:
+            yield (filename, *read(filename))
+        return
+
+    # the next file is submitted before the current one is yielded
+    with _futures.ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        for filename in filenames:
+            future = executor.submit(read, filename)
+            if pending is not None:
+                yield (pending[0], *pending[1].result())
+            pending = (filename, future)
+        if pending is not None:
+            yield (pending[0], *pending[1].result())
+
+def _read_table(filename, correlations=None, **kwargs):
+
+    with open(filename) as hdulist:
+        result = hdulist._to_table(correlations=correlations, **kwargs)
+    if correlations is None:
+        return (result,)
+    return result
+
+def _shared_copy(obj):
+
+    # Copy-on-write duplicate of an OIFITS or HDU: OIFITS tables share 
+    # their (read-only) data with the original.  It is only used inside
+    # pyoifits, see _own_shared_data.
+    if isinstance(obj, _fits.HDUList):
+        return type(obj)([_shared_copy(hdu) for hdu in obj])
+    if isinstance(obj, _OITableHDU):
+        return obj._shared_copy()
+    return obj.copy()
+
+def _own_shared_data(hdus):
+
+    # Tables still sharing their data with the OIFITS they were copied
+    # from are given a private copy before being handed to the caller,
+    # so that changes made to either are not seen by the other.  Tables
+    # dropped or rebuilt on the way have never been copied.
+    for hdu in hdus:
+        if isinstance(hdu, _OITableHDU):
+            hdu._own_data()
+
+def merge(*hdulists, workers=None, executor=None):
     """
 
 Merge several OIFITS.
@@ -91,11 +306,41 @@ Arguments
 hdulists1, hdulist2, ...
     OIFITS objects 
 
+Keyword arguments
+-----------------
+
+workers (int, optional, default: None)
+    Number of processes merging the interferometric data tables.  
+executor (concurrent.futures.Executor, optional, default: None)
+    Executor merging the interferometric data tables, for instance a
+    ProcessPoolExecutor.  It cannot be used together with workers.
+
+Data tables are merged by batches in the worker processes, and the
+partial results merged again until few enough are left (a reduction
+tree).  Target IDs, station indices, and reference names are set before, 
+and the result is identical to a serial merge.  It only pays off for
+large numbers of files.
+
     """
-    return _merge(*hdulists, _inplace=False)     
+    if executor is not None and workers is not None:
+        raise ValueError('workers and executor cannot be both given')
+
+    if workers is not None and workers > 1:
+        with _futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            merged = _merge(*hdulists, _inplace=False, _executor=executor)
+    else:
+        merged = _merge(*hdulists, _inplace=False, _executor=executor)
+    _own_shared_data(merged)
+
+    return merged
+
+def _merge(*hdulists, _inplace=False, _executor=None):
 
-def _merge(*hdulists, _inplace=False):
+    hdus, cls, maxver = _prepare_merge(*hdulists, _inplace=_inplace)
+    _merge_references(hdus)
+    return _finalize_merge(hdus, cls, maxver, executor=_executor)
 
+def _prepare_merge(*hdulists, _inplace=False):
 
     # Use the latest OIFITS version used by the OIFITS to be merged
     # We order them by newest version first.
@@ -110,7 +355,7 @@ def _merge(*hdulists, _inplace=False):
 
     # Copy files if necessary
     if not _inplace:
-        hdulists = [hdulist.copy() for hdulist in hdulists]
+        hdulists = [_shared_copy(hdulist) for hdulist in hdulists]
     
     # Trick to avoid Delayed columns
     # for hdulist in hdulists:
@@ -130,6 +375,10 @@ def _merge(*hdulists, _inplace=False):
     # * remove duplicates (OI tables only)
     _remove_equal_OITableHDUs(hdus)
 
+    return hdus, cls, maxver
+
+def _merge_references(hdus):
+
     # * merge TargetHDU, ArrayHDU when possible
     _merge_OITableHDUs(hdus, cls=(_TargetHDU, _ArrayHDU))
 
@@ -138,8 +387,10 @@ def _merge(*hdulists, _inplace=False):
     #   needlessly copied here
     _rename_conflicting_OITableHDUs(hdus)
 
+def _finalize_merge(hdus, cls, maxver, executor=None):
+
     # * merge interferometric data tables where possible
-    _merge_OITableHDUs(hdus, cls=_DataHDU)
+    _merge_OITableHDUs(hdus, cls=_DataHDU, executor=executor)
 
     # * if some extensions are of the wrong version, convert them
     for i, hdu in enumerate(hdus):
@@ -173,93 +424,346 @@ def _process_primaryHDUs(hdus):
             else:
                 del hdus[i]
        
-def _remove_equal_OITableHDUs(hdus, cls=_OITableHDU):
-    
-    for i, hdu in enumerate(hdus):
+def _remove_equal_OITableHDUs(hdus, cls=_OITableHDU, first=None):
+   
+    # Tables are only compared to the first table with the same content
+    # fingerprint, which is kept.  Tables with the same fingerprint have
+    # the same bytes: if they are not equal (NaN) no other table can be.
+    # first (fingerprint -> table) may be kept from a previous call.
+    if first is None:
+        first = {}
+    kept = []
+    for hdu in hdus:
+        if isinstance(hdu, cls):
+            other = first.setdefault(hdu._fingerprint(), hdu)
+            if other is not hdu and hdu == other:
+                continue
+        kept.append(hdu)
+    hdus[:] = kept
 
-        if not isinstance(hdu, cls):
-            continue
 
-        for j in range(len(hdus)-1, i, -1):
-            if hdus[j] == hdu:
-                del hdus[j]     
+def _rename_conflicting_OITableHDUs(hdus, cls=_Referenced):
 
+    # Tables of a given kind can only have conflicting ARRNAME, INSNAME, 
+    # or CORRNAME if these share the same base name: NAME or NAME_<number>
+    # (SequentialName) and renaming keeps the base name.  Tables are 
+    # grouped by kind and base name.
+    groups = {}
+    for hdu in hdus:
+        refkey = getattr(hdu, '_REFERENCE_KEY', None)
+        if not isinstance(hdu, cls) or not refkey:
+            continue
+        refname = _u.SequentialName(hdu.header[refkey])
+        key = (hdu._EXTNAME, refname.base)
+        groups.setdefault(key, []).append([hdu, refname])
 
-def _rename_conflicting_OITableHDUs(hdus, cls=_Referenced):
+    for group in groups.values():
 
-    for i, hdu1 in enumerate(hdus):
+        # Tables are taken in order and later tables with the same name 
+        # renamed using the lowest numbers not used by later tables. 
+        # We keep track of which later tables use each number.
+        later = {}
+        for index, (hdu, refname) in enumerate(group):
+            later.setdefault(int(refname), _collections.deque()).append(index)
 
-        if not isinstance(hdu1, cls):
-            continue
+        for index, (hdu1, refname1) in enumerate(group):
+            
+            number1 = int(refname1)
+            later[number1].popleft()
+            indices = list(later[number1])
+            if not indices:
+                continue
             
-        refkey = getattr(hdu1, '_REFERENCE_KEY', None)
-        if not refkey:
-            continue 
+            nlater = len(group) - index - 1
+            numbers = (n for n in range(1, nlater + len(indices) + 1)
+                            if not later.get(n))
+            numbers = list(_itertools.islice(numbers, len(indices)))
+            later[number1].clear()
+
+            for index2, number2 in zip(indices, numbers):
+                refname2 = _u.SequentialName(refname1.base, number2)
+                group[index2][0].rename(str(refname2))
+                group[index2][1] = refname2
+                later.setdefault(number2, _collections.deque()).append(index2)
+
+def _merge_OITableHDUs(hdus, cls=_OITableHDU, executor=None):
+
+    # Tables can only be merged if they have the same merge key.  In each 
+    # group sharing a key, the first table is merged with all later ones 
+    # it is mergeable with (%), then the next remaining one, etc.
+    groups = {}
+    for index, hdu in enumerate(hdus):
+        if isinstance(hdu, cls) and (key := hdu._merge_key()) is not None:
+            groups.setdefault(key, []).append(index)
+
+    merged = set()
+    pending = {}
+    for group in groups.values():
+        for k, index in enumerate(group):
+            if index in merged:
+                continue
+            hdu = hdus[index]
+            mergeable = [j for j in group[k + 1:] 
+                            if j not in merged and hdus[j] % hdu]
+            if not mergeable:
+                continue
+            if executor is None:
+                hdus[index] = hdu.merge(*[hdus[j] for j in mergeable])
+            else:
+                pending[index] = [hdu, *[hdus[j] for j in mergeable]]
+            merged.update(mergeable)
+    
+    if pending:
+        results = _tree_merge(list(pending.values()), executor)
+        for index, result in zip(pending, results):
+            hdus[index] = result
+
+    hdus[:] = [hdu for index, hdu in enumerate(hdus) if index not in merged]
+
+_TREE_MERGE_FANIN = 32
+
+def _tree_merge(groups, executor, fanin=_TREE_MERGE_FANIN):
+
+    # Each group of tables is merged by batches of fanin tables in the 
+    # executor, then the partial results are, until there are at most 
+    # fanin, merged here.  Rows are concatenated, which gives the same
+    # result whatever the batches, but merging headers depends on their
+    # order, so that the final header is made from the original ones. 
+    parts = list(groups)
+    while any(len(part) > fanin for part in parts):
+        batches = [(g, part[i:i + fanin]) for g, part in enumerate(parts)
+                        if len(part) > fanin
+                        for i in range(0, len(part), fanin)]
+        portables = [[_hdu_to_portable(hdu, rebuild=True) for hdu in batch]
+                        for g, batch in batches]
+        results = executor.map(_merge_portable, portables)
+        for g in {g for g, batch in batches}:
+            parts[g] = []
+        for (g, batch), result in zip(batches, results):
+            parts[g].append(_hdu_from_portable(result))
+
+    return [part[0]._merge_helper(*part[1:], 
+                    headers=[hdu.header for hdu in group])
+                for part, group in zip(parts, groups)]
+
+def _merge_portable(portables):
+
+    hdus = [_hdu_from_portable(portable) for portable in portables]
+    return _hdu_to_portable(hdus[0].merge(*hdus[1:]))
+
+class MergeAccumulator:
+    """
 
-        # We then look if any further HDU has a duplicate name of hdus[i]. 
-        # Sequential Name behaves like a string 'refname_number' aware
-        # of its own numbering.
+Merge OIFITS incrementally, as they arrive.  OIFITS objects are added
+one at a time: duplicate tables are removed, OI_TARGET and OI_ARRAY 
+tables merged, and conflicting ARRNAME, INSNAME, CORRNAME renamed 
+against indexes kept between calls, so that adding an OIFITS takes a 
+time proportional to its own size, not to the size of what has already
+been added.  Interferometric data tables are merged, and the result 
+verified and sorted, once by finalize().
 
-        hdus2 = hdus[i + 1:]
-        
-        refname1 = _u.SequentialName(hdu1.header[refkey])
-        refhdus2 = [hdu2 for hdu2 in hdus2 if hdu2 & hdu1]
-        refnames2 = [_u.SequentialName(h.header[refkey]) for h in refhdus2] 
-        equal = [refname1 == refname2 for refname2 in refnames2]
-        indices = _np.argwhere(equal)[:,0]
-        nequal = len(indices)
-        if not nequal:
-            continue
+Arguments
+---------
+
+hdulist1, hdulist2, ... (optional)
+    OIFITS objects to start with.
+
+Keyword arguments
+-----------------
+
+copy (bool, optional, default: True)
+    Whether OIFITS objects are copied before being added.  If False,
+    they are modified in place, as in openlist().
 
-        # If there are equal names, then rename using name_number.  We
-        # need to look at name_number to pick a non used number...
-        # seqname1 % seqname2 means same name but different number.  From
-        # the list, we can pick available names. 
-     
-        refs = [refname2 for refname2 in refnames2 if refname2 % refname1] 
-        new_refnames2 = refname1.next_available(refs, nequal)
+Example
+-------
+
+>>> accumulator = MergeAccumulator()
+>>> for filename in filenames:
+...     accumulator.add(open(filename, lazy_load_hdus=False))
+>>> merged = accumulator.finalize()
+
+    """
+    def __init__(self, *hdulists, copy=True):
+        self._cls = None
+        self._maxver = 0
+        self._hdus = []
+        self._primary_headers = []
+        self._fingerprints = {}  # fingerprint -> first OI table
+        self._groups = {}        # merge key -> indices of OI_TARGET/OI_ARRAY
+        self._names = {}         # (EXTNAME, base name) -> {number: table}
+        self._finalized = False
+        self.add(*hdulists, copy=copy)
+
+    def __repr__(self):
+        name = type(self).__name__
+        return f"<{name} at {hex(id(self))} ({len(self._hdus)} HDUs)>"
+
+    def add(self, *hdulists, copy=True):
+        """
+
+Add OIFITS objects.
+
+Arguments
+---------
+
+hdulist1, hdulist2, ...
+    OIFITS objects
 
-        for index in indices:
+Keyword arguments
+-----------------
 
-            #refname2 = refnames2[index]
-            refhdu2 = refhdus2[index]
-            new_refname2 = str(new_refnames2.pop(0))
-            refhdu2.rename(new_refname2)
+copy (bool, optional, default: True)
+    Whether OIFITS objects are copied before being added.
 
-            #container = refhdu2.get_container()
-            #if not container:
-            #    continue
+        """
+        if self._finalized:
+            raise RuntimeError(f"{type(self).__name__} already finalized")
+
+        for hdulist in hdulists:
+            if copy:
+                start = len(self._hdus)
+                self._add(_shared_copy(hdulist))
+                _own_shared_data(self._hdus[start:])
+            else:
+                self._add(hdulist)
+
+    def _add(self, hdulist):
+
+        # Latest OIFITS version used 
+        oiver = getattr(hdulist, '_OI_VER', 0)
+        if self._cls is None or oiver > self._maxver:
+            self._cls = type(hdulist)
+            self._maxver = oiver
+
+        # Primary headers are merged once at the end.  Only the first 
+        # primary HDU is kept, others are converted to images if they 
+        # have data.
+        hdus = []
+        for hdu in hdulist:
+            if isinstance(hdu, _PrimaryHDU):
+                self._primary_headers.append(hdu.header)
+            if isinstance(hdu, _fits.PrimaryHDU) and (self._hdus or hdus):
+                if hdu.data is None:
+                    continue
+                hdu = _fits.ImageHDU(data=hdu.data, header=hdu.header)
+            hdus.append(hdu)
+
+        # Remove duplicates of tables already added or in this OIFITS
+        _remove_equal_OITableHDUs(hdus, first=self._fingerprints)
+
+        # Merge OI_TARGET and OI_ARRAY with the ones already added.  The
+        # target IDs and station indices of the tables already added are 
+        # kept, those of this OIFITS are updated.
+        kept = []
+        for hdu in hdus:
+            if (isinstance(hdu, (_TargetHDU, _ArrayHDU)) and 
+                    (key := hdu._merge_key()) is not None):
+                for index in self._groups.get(key, []):
+                    if hdu % self._hdus[index]:
+                        self._hdus[index] = self._hdus[index].merge(hdu)
+                        break
+                else:
+                    kept.append(hdu)
+            else:
+                kept.append(hdu)
+        hdus = kept
+
+        # Rename tables whose ARRNAME, INSNAME, or CORRNAME is in use.  If
+        # a table with another number has the same data, its name is used
+        # and the table dropped, otherwise the lowest number neither in 
+        # use nor used by the next tables of this OIFITS.
+        pending = _collections.Counter()
+        refnames = []
+        for hdu in hdus:
+            refkey = getattr(hdu, '_REFERENCE_KEY', None)
+            if isinstance(hdu, _Referenced) and refkey:
+                refname = _u.SequentialName(hdu.header[refkey])
+                key = (hdu._EXTNAME, refname.base)
+                pending[key, int(refname)] += 1
+                refnames.append((hdu, refname, key))
+
+        dropped = set()
+        for hdu, refname, key in refnames:
+            number = int(refname)
+            pending[key, number] -= 1
+            taken = self._names.setdefault(key, {})
+            if number in taken:
+                equal = (n for n, other in taken.items() 
+                                if _equal_data(hdu, other))
+                if (number := next(equal, None)) is not None:
+                    dropped.add(id(hdu))
+                else:
+                    number = next(n for n in _itertools.count(1)
+                                if n not in taken and not pending[key, n])
+                    taken[number] = hdu
+                hdu.rename(str(_u.SequentialName(refname.base, number)))
+            else:
+                taken[number] = hdu
+        hdus = [hdu for hdu in hdus if id(hdu) not in dropped]
         
-            #referrers = container.get_referrers(refhdu2)
-            #for h in referrers:
-            #    h.header[refkey] = new_refname2
-            #
-            #refhdu2.header[refkey] = new_refname2
-            #
-            #if refkey == 'INSNAME':
-            #    for h in container.getInspolHDU():
-            #        insname = h.data['INSNAME'] 
-            #        h.data['INSNAME'][insname == refname2] = new_refname2
+        # Tables referring to renamed ones may now be duplicates
+        _remove_equal_OITableHDUs(hdus, first=self._fingerprints)
 
+        for hdu in hdus:
+            if (isinstance(hdu, (_TargetHDU, _ArrayHDU)) and 
+                    (key := hdu._merge_key()) is not None):
+                self._groups.setdefault(key, []).append(len(self._hdus))
+            self._hdus.append(hdu)
+
+    def finalize(self):
+        """
 
-def _merge_OITableHDUs(hdus, cls=_OITableHDU):
+Merge the interferometric data tables and return the merged OIFITS. No
+OIFITS can be added afterwards.
 
-    # find all equal HDUs and remove them
+Returns
+-------
 
-    for i, hdu in enumerate(hdus):    
+The merged OIFITS
 
-        if not isinstance(hdu, cls):
-            continue
+        """
+        if self._finalized:
+            raise RuntimeError(f"{type(self).__name__} already finalized")
+        if self._cls is None:
+            raise RuntimeError("no OIFITS to merge")
         
-        # Find all mergeable HDUs, merge them 
-        nhdu = len(hdus)
-        is_mergeable = [hdus[k] % hdu if k > i else False for k in range(nhdu)]
-        where_mergeable = _np.argwhere(is_mergeable)[:,0]
-        if len(where_mergeable):
-            mergeable = [hdus[m] for m in where_mergeable]
-            hdus[i] = hdus[i].merge(*mergeable)
-            for j in where_mergeable[::-1]:
-                del hdus[j]
+        hdus = self._hdus
+        if self._primary_headers:
+            header = _fu.merge_fits_headers(*self._primary_headers)
+            hdus[0].header = header
+
+        self._finalized = True
+        self._hdus = []
+        self._primary_headers = []
+        self._fingerprints = {}
+        self._groups = {}
+        self._names = {}
+
+        return _finalize_merge(hdus, self._cls, self._maxver)
+
+# Reference tables are looked up by (EXTNAME, reference name) in an index
+# (see _OIFITS._get_reference_HDU).  OI_TARGET has no reference name.
+_REFERENCE_KEYS = {_TargetHDU: None, _ArrayHDU: 'ARRNAME',
+                   _WavelengthHDU: 'INSNAME', _CorrHDU: 'CORRNAME',
+                   _InspolHDU: 'ARRNAME'}
+
+def _reference_key(hdu):
+
+    for cls, refkey in _REFERENCE_KEYS.items():
+        if isinstance(hdu, cls):
+            name = None
+            if refkey is not None:
+                name = hdu.header.get(refkey) or None
+            return cls._EXTNAME, name
+
+    return None
+
+def _equal_data(hdu1, hdu2):
+
+    data1, data2 = hdu1.data, hdu2.data
+    return (len(data1) == len(data2) and data1.dtype == data2.dtype and
+            (data1.view(_np.ndarray) == data2.view(_np.ndarray)).all())
    
 class _OIFITS(_fits.HDUList):
 
@@ -314,12 +818,50 @@ target_name_match (bool, default: False)
         for hdu in list.__iter__(hdus):
             hdu._container = self
 
+    # The index of reference tables is reset whenever HDUs are added,
+    # removed, or reordered.
+
+    def __setitem__(self, key, hdu):
+        self._reference_index = None
+        super().__setitem__(key, hdu)
+
+    def __delitem__(self, key):
+        self._reference_index = None
+        super().__delitem__(key)
+
+    def __iadd__(self, hdus):
+        self._reference_index = None
+        return super().__iadd__(hdus)
+
+    def insert(self, index, hdu):
+        self._reference_index = None
+        super().insert(index, hdu)
+
+    def extend(self, hdus):
+        self._reference_index = None
+        super().extend(hdus)
+
+    def remove(self, hdu):
+        self._reference_index = None
+        super().remove(hdu)
+
+    def clear(self):
+        self._reference_index = None
+        super().clear()
+
+    def reverse(self):
+        self._reference_index = None
+        super().reverse()
+
     # original _read_next_hdu() uses super().append(), ruining any clean 
     # attempt to subclass HDUList
     def _read_next_hdu(self):
-        
-        has_new_hdu = super()._read_next_hdu()
+       
+        # OIFITS extensions are only recognised here
+        with _oifits_hdu_dispatch():
+            has_new_hdu = super()._read_next_hdu()
         if has_new_hdu:
+            self._reference_index = None
             last_index = list.__len__(self) - 1 # len(x) would load all HDUs
             hdu = self[last_index]
             if isinstance(hdu, _OITableHDU):
@@ -460,8 +1002,7 @@ arrname (str)
     Name of the array
 
         """
-        def same_arrname(h): return h.get_arrname() == arrname
-        return self.get_HDU(_ArrayHDU, same_arrname)
+        return self._get_reference_HDU(_ArrayHDU, arrname)
     
     def get_vis2HDUs(self):
         """
@@ -485,7 +1026,7 @@ Get the HDUs containing closure (3T) data
         """
 Get the HDU containing target information (OI_TARGET)
         """
-        return self.get_HDU(_TargetHDU) 
+        return self._get_reference_HDU(_TargetHDU)
 
     def get_fluxHDUs(self):
         return self.get_HDUs(_FluxHDU)
@@ -508,8 +1049,7 @@ insname (str)
     Name of the instrumental setup
 
         """ 
-        def same_insname(h): return h.get_insname() == insname
-        return self.get_HDU(_WavelengthHDU, same_insname)
+        return self._get_reference_HDU(_WavelengthHDU, insname)
 
     def get_corrHDUs(self):
         """
@@ -528,8 +1068,7 @@ corrname:
     Name of the correlation matrix
 
         """
-        def same_corrname(h): h.get_corrname() == corrname
-        return self.get_HDU(_CorrHDU, same_corrname)
+        return self._get_reference_HDU(_CorrHDU, corrname)
 
     def get_inspolHDUs(self):
 
@@ -547,13 +1086,43 @@ arrname:
     Name of the array
 
         """
-        def same_arrname(h): return h.get_arrname() == arrname
-        return self.get_HDU(_InspolHDU, same_arrname)
+        return self._get_reference_HDU(_InspolHDU, arrname)
+
+    def _get_reference_HDU(self, cls, name=None):
+
+        # Reference tables are looked up in an index of the first table
+        # for each (EXTNAME, reference name), built when needed.  As names
+        # can be changed in the headers, it is rebuilt if the table found
+        # has another name, or if none is found and a table of the same
+        # EXTNAME has been renamed.
+        key = (cls._EXTNAME, name or None)
+        index = getattr(self, '_reference_index', None)
+        if index is not None:
+            first, tables = index
+            hdu = first.get(key)
+            if hdu is not None:
+                stale = _reference_key(hdu) != key
+            else:
+                stale = any(_reference_key(h) != k
+                                for h, k in tables.get(key[0], []))
+            if not stale:
+                return hdu
+
+        first, tables = {}, {}
+        for hdu in self[1:]:
+            refkey = _reference_key(hdu)
+            if refkey is not None:
+                first.setdefault(refkey, hdu)
+                tables.setdefault(refkey[0], []).append((hdu, refkey))
+        self._reference_index = first, tables
+        return first.get(key)
 
     def _to_table(self, *, correlations=None, remove_masked=False,
         **kwargs):
 
-        dataHDUs = self.get_dataHDUs()
+        # tables whose observables were all dropped (see open) are skipped
+        dataHDUs = [h for h in self.get_dataHDUs() 
+            if any(n in h.columns.names for n in h.get_observable_names())]
 
         return_corr = correlations is not None
 
@@ -569,7 +1138,8 @@ arrname:
         if not return_corr:
             return tab
 
-        corr = _sparse.identity(len(tab), format='dok') 
+        from scipy import sparse
+        corr = sparse.identity(len(tab), format='dok') 
 
         # treat each OI_CORR separately, then look up indices
         # in the full table
@@ -732,7 +1302,7 @@ Returns:
  
         trimmed = [h._trim_helper(target_filter=tfilter, wave_filter=wfilter,
                 insname_filter=ifilter, keep_ns_columns=keep_ns_columns)
-            if isinstance(h, _OITableHDU) else h.copy() for h in trimmed]
+            if isinstance(h, _OITableHDU) else _shared_copy(h) for h in trimmed]
 
 
         # Remove empty HDUs (either zero line or zero dimension in
@@ -768,7 +1338,7 @@ An OIFITS1 or OIFITS2 object.
            msg = 'Binning OIFITS with correlation or polarimetry info'
            raise NotImplementedError(msg)
 
-        hdulist = [h.copy() for h in self 
+        hdulist = [_shared_copy(h) for h in self 
                         if not isinstance(h, (_DataHDU, _WavelengthHDU))]
 
         for whdu in self.get_wavelengthHDUs():
@@ -780,9 +1350,24 @@ An OIFITS1 or OIFITS2 object.
             dhdus = [dhdu._bin_helper(weights) for dhdu in dhdus]
 
             hdulist += [whdu, *dhdus]
+        _own_shared_data(hdulist)
 
         return type(self)(hdulist)
 
+    def sort(self):
+        """
+
+Sort the HDUs: primary HDU, then OIFITS extensions by type (OI_TARGET,
+OI_ARRAY, OI_WAVELENGTH, OI_VIS, OI_VIS2, OI_T3, OI_FLUX, OI_CORR,
+OI_INSPOL), array, instrument, correlation, and first date of
+observation, and last other extensions.  HDUs comparing equal keep
+their order.
+
+        """
+        # Keys are computed once per HDU.
+        self._reference_index = None
+        super().sort(key=_hdu_sort_key)
+
     def update_extver(self):
         """
 
@@ -985,7 +1570,8 @@ fig (matplotlib.figure.Figure)
         unique_subkey, unique_subindex = _np.unique(subkey, return_inverse=True)
         
         if fig is None or isinstance(fig, int):
-            fig = _plt.figure(fig)
+            from matplotlib import pylab as plt
+            fig = plt.figure(fig)
             fig.clf()
         
         naxes = len(unique_key)
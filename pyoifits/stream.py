@@ -0,0 +1,358 @@
+"""
+Merging of OIFITS files whose merged data do not fit in memory: the merge
+is planned on the headers and reference tables, and the rows of the
+interferometric data tables are streamed to the output file.
+"""
+
+import os as _os
+import re as _re
+import io as _io
+import errno as _errno
+import datetime as _datetime
+import contextlib as _contextlib
+
+from astropy.io import fits as _fits
+import numpy as _np
+
+from . import fitsutils as _fu
+from . import oifits as _oifits
+from .hdu.data import _DataHDU, _DataHDU2
+
+# Columns rewritten by the merge of OI_TARGET and OI_ARRAY tables.
+_ID_COLUMNS = ('TARGET_ID', 'STA_INDEX')
+
+# Temporary column in which the stand-ins of data tables number their rows.
+# Being non-standard, it is kept as is by merging, version conversion, and
+# verification, and it is removed before the tables are written.
+_PROVENANCE_COLUMN = 'NS_PYOIFITS_ROW'
+
+_BLOCK_SIZE = 2880
+
+def merge_to_file(filenames, output, *, overwrite=False,
+        chunk_size=2**24):
+    """
+
+Merge a list of OIFITS files and write the result to a file, without
+holding the merged OIFITS in memory.
+
+The merge is planned with the headers and the reference tables (OI_TARGET,
+OI_ARRAY, OI_WAVELENGTH, etc.), interferometric data tables being replaced
+by stand-ins of a few rows.  Once the output file is allocated, the rows
+of the data tables are copied to it block by block from the memory-mapped
+input files, their target IDs and station indices being updated on the
+way.  Duplicate data tables are found by hashing the memory-mapped data.
+
+The output is the same as that of openlist(filenames).writeto(output),
+except for the dates in the comments of CHECKSUM and DATASUM keywords.
+(Outside of the astropy versions of fitsutils.FAST_COPY, the keywords of
+data tables may be in another order and have other comments.)
+
+Arguments
+---------
+
+filenames (str × N)
+    File names
+output (str)
+    Output file name
+
+Keyword arguments
+-----------------
+
+overwrite (bool, optional, default: False)
+    Whether the output file is overwritten if it exists.
+chunk_size (int, optional, default: 16 MiB)
+    Approximate size (in bytes) of the blocks of rows copied at a time.
+
+    """
+    with _contextlib.ExitStack() as stack:
+        hdulists = [stack.enter_context(_oifits.open(filename, memmap=True,
+                            lazy_load_hdus=False)) for filename in filenames]
+        hdus, cls, maxver = _oifits._prepare_merge(*hdulists, _inplace=True)
+        sources = _replace_by_standins(hdulists, hdus)
+        _oifits._merge_references(hdus)
+        merged = _oifits._finalize_merge(hdus, cls, maxver)
+        _write_streamed(merged, sources, output, overwrite=overwrite,
+                        chunk_size=chunk_size)
+
+def _replace_by_standins(hdulists, hdus):
+
+    # Data tables are replaced by their stand-ins in the list of HDUs to
+    # merge and in their OIFITS, so that the stand-ins are updated when
+    # OI_TARGET and OI_ARRAY are merged (IDs) or renamed (reference names).
+    # The k-th stand-in row comes from sources[k] = (table, row).
+    sources = []
+    standins = {}
+    for hdulist in hdulists:
+        for index, hdu in enumerate(hdulist):
+            if isinstance(hdu, _DataHDU):
+                standin, rows = _standin(hdu, first=len(sources))
+                sources.extend((hdu, row) for row in rows)
+                standins[id(hdu)] = standin
+                hdulist[index] = standin
+    hdus[:] = [standins.get(id(hdu), hdu) for hdu in hdus]
+
+    return sources
+
+def _standin(hdu, first=0):
+
+    # A stand-in has the header and the columns of the table, and the rows
+    # with the lowest and highest MJD (dates in the primary header, order
+    # of tables) and where each ID first appears, so that the new IDs
+    # given by the merge can be read from it.  Its rows are numbered from
+    # first in the provenance column.
+    data = hdu.data
+    if _PROVENANCE_COLUMN in data.names:
+        raise ValueError(f"{hdu} cannot be streamed: has {_PROVENANCE_COLUMN}")
+
+    rows = []
+    if len(data):
+        mjd = data['MJD']
+        rows += [_np.argmin(mjd), _np.argmax(mjd)]
+        for name in _ID_COLUMNS:
+            if name in data.names:
+                values = data[name].reshape(len(data), -1)
+                unique, index = _np.unique(values, return_index=True)
+                rows += list(index // values.shape[1])
+    rows = _np.unique(_np.array(rows, dtype=int))
+
+    # Rows taken by indexing share their column definitions with the table,
+    # which must not see the column renames of the merge.  The provenance
+    # column is added at the end of the header, whose other keywords are
+    # kept.
+    subset = _fu.copy_fits_rec(data[rows])
+    standin = hdu._clone(subset, keep_header=True)
+    provenance = _fits.Column(name=_PROVENANCE_COLUMN, format='K',
+                              array=first + _np.arange(len(rows)))
+    standin._set_data(_fits.FITS_rec.from_columns(subset.columns + provenance))
+    header = standin.header
+    index = len(standin.columns)
+    header[f"TTYPE{index}"] = _PROVENANCE_COLUMN
+    header[f"TFORM{index}"] = 'K'
+    header['TFIELDS'] = index
+    header['NAXIS1'] = standin.data.itemsize
+
+    return standin, rows
+
+def _drop_provenance(hdu):
+
+    # The header is kept as is, columns keywords and checksums included,
+    # except for the keywords of the provenance column (if the table has
+    # been rebuilt since it was made a stand-in) and the numbers of the
+    # next columns.
+    columns = [_fits.Column(name=col.name, format=col.format, unit=col.unit,
+                    dim=col.dim, null=col.null, disp=col.disp,
+                    array=hdu.data[col.name])
+                    for col in hdu.columns if col.name != _PROVENANCE_COLUMN]
+    new = hdu._clone(_fits.FITS_rec.from_columns(columns), keep_header=True)
+
+    header = new.header
+    keywords = []
+    for card in header.cards:
+        match = _re.fullmatch('([A-Z]+)([0-9]+)', card.keyword)
+        if match and match[1] in _fits.column.KEYWORD_NAMES:
+            keywords.append((int(match[2]), match[1]))
+    keywords.sort()
+    index = next((n for n, root in keywords if root == 'TTYPE' and
+                    header[f"TTYPE{n}"] == _PROVENANCE_COLUMN), None)
+    if index is not None:
+        for n, root in keywords:
+            if n == index:
+                del header[f"{root}{n}"]
+            elif n > index:
+                header.rename_keyword(f"{root}{n}", f"{root}{n - 1}")
+    header['NAXIS1'] = new.data.itemsize
+    header['TFIELDS'] = len(columns)
+
+    return new
+
+def _stream_plan(hdu, sources):
+
+    # The rows of a merged stand-in are those of the stand-ins of the
+    # source tables, in order.  For each source table, the IDs are mapped
+    # from their original values to the ones of the merged stand-in.
+    provenance = _np.asarray(hdu.data[_PROVENANCE_COLUMN]).astype(int)
+    parts = []
+    for position, k in enumerate(provenance):
+        table, row = sources[k]
+        if not parts or parts[-1][0] is not table:
+            parts.append((table, [], []))
+        parts[-1][1].append(row)
+        parts[-1][2].append(position)
+
+    plan = []
+    for table, rows, positions in parts:
+        maps = {}
+        for name in _ID_COLUMNS:
+            if name in table.columns.names and name in hdu.columns.names:
+                old = _np.ravel(table.data[name][rows]).tolist()
+                new = _np.ravel(hdu.data[name][positions]).tolist()
+                maps[name] = {o: n for o, n in zip(old, new) if o != n}
+        plan.append((table, maps))
+
+    # Merged tables have all the columns of the source tables, in order
+    # of appearance, and the provenance column.  Verification may have 
+    # renamed some of them since.
+    names, columns = _fu.merge_columns(*[table for table, maps in plan])
+    if len(names) != len(hdu.columns) - 1:
+        raise RuntimeError(f"columns of {hdu} do not match its sources")
+
+    return names, plan
+
+def _iter_chunks(hdu, names, plan, chunk_size):
+
+    # Rows of the source tables, with the columns of the merged one, in
+    # blocks of about chunk_size bytes.  Missing columns are filled with
+    # zeros, and negative errors of OIFITS2 data replaced by NaN as does
+    # the verification of the merged table.
+    columns = hdu.columns
+    templates = [hdu.data[col.name] for col in columns]
+    err_names = []
+    if isinstance(hdu, _DataHDU2):
+        err_names = [n for n in hdu.get_error_names() if n in columns.names]
+    nrows = max(1, chunk_size // hdu.header['NAXIS1'])
+
+    for table, maps in plan:
+        data = table.data
+        for start in range(0, len(data), nrows):
+            chunk = data[start:start + nrows]
+            fcols = []
+            for name, col, template in zip(names, columns, templates):
+                if name in chunk.names:
+                    value = chunk[name]
+                    if maps.get(name):
+                        value = _fu.remap(value, maps[name])
+                else:
+                    shape = (len(chunk), *template.shape[1:])
+                    value = _np.zeros(shape, dtype=template.dtype)
+                fcols.append(_fits.Column(name=col.name, format=col.format,
+                    unit=col.unit, dim=col.dim, null=col.null,
+                    disp=col.disp, array=value))
+            rec = _fits.FITS_rec.from_columns(fcols)
+            for name in err_names:
+                errval = rec[name]
+                errval[(errval < 0) & ~rec['FLAG']] = _np.nan
+            yield rec
+
+def _write_streamed(hdulist, sources, output, *, overwrite=False,
+        chunk_size=2**24):
+
+    # The rows of the merged stand-ins are mapped to their sources before
+    # the provenance column is dropped.  Checksums computed during the 
+    # merge are those of the stand-in data and will be updated, other ones
+    # (e.g. MULTI) are written unchanged.
+    plans = {}
+    for index, hdu in enumerate(hdulist):
+        if isinstance(hdu, _DataHDU):
+            names, plan = _stream_plan(hdu, sources)
+            datasum = _fu.checksum_sum(_chunk_bytes(hdu.data))
+            checksum = hdu.header.get('DATASUM') == str(datasum)
+            hdulist[index] = hdu = _drop_provenance(hdu)
+            plans[id(hdu)] = names, plan, checksum
+
+    # The merged OIFITS, with the stand-ins, is written as writeto() would
+    # write the merged one.  Other HDUs are copied from it, the rows of
+    # the stand-ins being replaced by those of the source tables.
+    buffer = _io.BytesIO()
+    hdulist.writeto(buffer)
+    content = buffer.getvalue()
+    with _fits.open(_io.BytesIO(content), lazy_load_hdus=False) as written:
+        infos = [written.fileinfo(index) for index in range(len(written))]
+        headers = [hdu.header for hdu in written]
+
+    # The file size is known from the headers, given the number of rows of
+    # the full tables.
+    streamed = {}
+    size = 0
+    for index, hdu in enumerate(hdulist):
+        info = infos[index]
+        if id(hdu) in plans:
+            names, plan, checksum = plans[id(hdu)]
+            header = headers[index]
+            nrows = sum(len(table.data) for table, maps in plan)
+            header['NAXIS2'] = nrows
+            streamed[index] = header, names, plan, checksum
+            size += len(header.tostring()) 
+            size += -(-nrows * header['NAXIS1'] // _BLOCK_SIZE) * _BLOCK_SIZE
+        else:
+            size += info['datLoc'] + info['datSpan'] - info['hdrLoc']
+
+    with open(output, 'wb' if overwrite else 'xb') as fileobj:
+        _preallocate(fileobj, size)
+        for index, hdu in enumerate(hdulist):
+            if index in streamed:
+                header, names, plan, checksum = streamed.pop(index)
+                _write_streamed_table(fileobj, hdu, header, names, plan,
+                            checksum, chunk_size=chunk_size)
+            else:
+                info = infos[index]
+                fileobj.write(content[info['hdrLoc']:
+                                      info['datLoc'] + info['datSpan']])
+        fileobj.truncate()
+
+def _preallocate(fileobj, size):
+
+    # Disk space is reserved if the file system allows it, so that a lack
+    # of space is found before anything is written.
+    try:
+        _os.posix_fallocate(fileobj.fileno(), 0, size)
+    except AttributeError:
+        fileobj.truncate(size)
+    except OSError as e:
+        if e.errno not in (_errno.EOPNOTSUPP, _errno.EINVAL):
+            raise
+        fileobj.truncate(size)
+
+def _chunk_bytes(rec):
+
+    # Bytes of the rows of a chunk as written in a FITS file.
+    hdu = _fits.BinTableHDU(data=rec)
+    buffer = _io.BytesIO()
+    hdu.writeto(buffer)
+    start = len(_fits.PrimaryHDU().header.tostring())
+    start += len(hdu.header.tostring())
+    return buffer.getbuffer()[start:start + hdu.header['NAXIS1'] * len(rec)]
+
+def _write_streamed_table(fileobj, hdu, header, names, plan, checksum, *,
+        chunk_size=2**24):
+
+    header_offset = fileobj.tell()
+    fileobj.write(header.tostring().encode('ascii'))
+
+    # Checksums are computed on words of 4 bytes, whatever the size
+    # of the chunks.
+    datasum = 0
+    pending = b''
+    size = 0
+    for rec in _iter_chunks(hdu, names, plan, chunk_size):
+        raw = _chunk_bytes(rec)
+        fileobj.write(raw)
+        size += len(raw)
+        if checksum:
+            if pending:
+                nbytes = min(4 - len(pending), len(raw))
+                pending += bytes(raw[:nbytes])
+                raw = raw[nbytes:]
+                if len(pending) == 4:
+                    datasum = _fu.checksum_sum(pending, datasum)
+                    pending = b''
+            nbytes = len(raw) // 4 * 4
+            datasum = _fu.checksum_sum(raw[:nbytes], datasum)
+            pending += bytes(raw[nbytes:])
+    if size % _BLOCK_SIZE:
+        fileobj.write(b'\0' * (_BLOCK_SIZE - size % _BLOCK_SIZE))
+
+    # The header is rewritten in place, its size being unchanged.
+    if checksum:
+        datasum = _fu.checksum_sum(pending, datasum)
+        when = _datetime.datetime.now().isoformat()[:19]
+        header['DATASUM'] = (str(datasum),
+                             f"data unit checksum updated {when}")
+        if 'CHECKSUM' in header:
+            header['CHECKSUM'] = ('0' * 16, f"HDU checksum updated {when}")
+            sum32 = _fu.checksum_sum(header.tostring().encode('ascii'), 
+                                     datasum)
+            header['CHECKSUM'] = _fu.encode_checksum(sum32)
+        end = fileobj.tell()
+        fileobj.seek(header_offset)
+        fileobj.write(header.tostring().encode('ascii'))
+        fileobj.seek(end)
@@ -1,18 +1,24 @@
 import numpy as np
 from astropy.io import fits
 import re
-from scipy.spatial.transform import Rotation
+from concurrent.futures import ThreadPoolExecutor
 
 class SequentialName(object):
 
-    def __init__(self, s, n=1):
+    def __init__(self, s, n=None):
         s = str(s)
-        if m := re.match("^(.*)_([0-9]+)$", s):
-            s = m.groups()[0]
-            n = int(m.groups()[1])
+        if n is None:
+            n = 1
+            if m := re.match("^(.*)_([0-9]+)$", s):
+                s = m.groups()[0]
+                n = int(m.groups()[1])
         self._s = s
         self._n = n
 
+    @property
+    def base(self):
+        return self._s
+
     def __str__(self):
         if self._n == 1:
             return self._s
@@ -41,7 +47,7 @@ class SequentialName(object):
             return cls.next_available(used, n=1)[0]
         m = set(range(1, len(used) + n + 1)) - set([int(u) for u in used])
         m = sorted(m)[0:n]
-        return [cls(used[0], i) for i in m] 
+        return [cls(used[0].base, i) for i in m] 
 
 
 def InheritConstantArray(varname, dtype=None):
@@ -179,7 +185,25 @@ def store_default(columns, name, *, default, shape=()):
     if shape:
         columns[name] = _np.full(shape, columns[name])
 
+def executor_map(func, iterable, *, workers=None, executor=None):
+    """Apply func to each element of iterable and return the list of
+    results in the same order.  Calls are concurrent if an executor 
+    (concurrent.futures.Executor) or a number of worker threads is given."""
+
+    if executor is not None and workers is not None:
+        raise ValueError('workers and executor cannot be both given')
+
+    if executor is not None:
+        return list(executor.map(func, iterable))
+
+    if workers is None or workers <= 1:
+        return [func(x) for x in iterable]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, iterable))
+
 def rotation3d(array, axes, angles, degrees=False):
+    from scipy.spatial.transform import Rotation
     rot = Rotation.from_euler(axes, angles, degrees=degrees)
     shape = np.shape(array)
     array = rot.apply(array.reshape((-1, 3))).reshape(shape)
@@ -0,0 +1,49 @@
+# Time the construction of OIFITS tables and the access to their columns
+# as attributes (hdu.VIS2DATA, etc.), which look up the column descriptions
+# of the standard.
+#
+# Usage: python benchmark_columns.py [number of repetitions, default: 2000]
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+filename = os.path.join('..', 'demo', 'introfiles', 'gravity-2.fits')
+repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+hdulist = oifits.open(filename, lazy_load_hdus=False)
+vis2 = hdulist.get_vis2HDUs()[0]
+data, header = vis2.data, vis2.header
+
+def construct():
+    type(vis2)(data=data, header=header)
+
+def copy():
+    vis2.copy()
+
+def get_column():
+    vis2.VIS2DATA
+
+def get_attribute():
+    vis2.header
+
+def set_attribute():
+    vis2.benchmark = None
+
+def observable_names():
+    vis2.get_observable_names()
+
+print(f"OI_VIS2 tables ({len(data)} rows)")
+for func in [construct, copy, get_column, get_attribute, set_attribute,
+             observable_names]:
+    start = time.perf_counter()
+    for i in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"    {func.__name__:16}: {elapsed * 1e6:9.2f} µs")
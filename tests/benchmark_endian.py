@@ -0,0 +1,38 @@
+# Time to_table() and bin_spectral_channels() on the demo GRAVITY files
+# when they are kept big-endian (as in FITS files) and when they are
+# converted to the native byte order at load (native_endian=True).
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+demo_dir = os.path.join('..', 'demo', 'introfiles')
+filenames = sorted(os.listdir(demo_dir))
+filenames = [os.path.join(demo_dir, f) for f in filenames
+                if f.startswith('gravity') and f.endswith('.fits')]
+
+def timeit(func, repeat=10):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+for native_endian in [False, True]:
+    load = timeit(lambda: [oifits.open(f, native_endian=native_endian,
+                    lazy_load_hdus=False) for f in filenames])
+    hdulists = [oifits.open(f, native_endian=native_endian,
+                    lazy_load_hdus=False) for f in filenames]
+    to_table = timeit(lambda: [h.to_table() for h in hdulists])
+    binning = timeit(lambda: [h.bin_spectral_channels(10) for h in hdulists])
+    print(f"native_endian={native_endian}")
+    print(f"    open                 : {load * 1e3:7.1f} ms")
+    print(f"    to_table             : {to_table * 1e3:7.1f} ms")
+    print(f"    bin_spectral_channels: {binning * 1e3:7.1f} ms")
@@ -0,0 +1,40 @@
+# Time `python -c 'import pyoifits'` in fresh interpreters, as paid by
+# each short-lived worker process, and check that heavy optional
+# dependencies are only imported when they are used.
+
+import os
+import sys
+import time
+import subprocess
+import statistics
+
+repeat = 10
+package_dir = os.path.abspath('..')
+env = dict(os.environ, PYTHONPATH=package_dir)
+
+def run(code):
+    return subprocess.run([sys.executable, '-c', code], env=env,
+                check=True, capture_output=True, text=True).stdout
+
+# baseline: interpreter start-up only
+durations = {}
+for name, code in [('python', 'pass'), ('import pyoifits', 'import pyoifits')]:
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        run(code)
+        times.append(time.perf_counter() - start)
+    durations[name] = times
+    print(f"{name:16}: min {min(times):.3f} s, "
+          f"median {statistics.median(times):.3f} s")
+
+cost = min(durations['import pyoifits']) - min(durations['python'])
+print(f"{'import cost':16}: {cost:.3f} s")
+
+deferred = ['matplotlib', 'astroquery', 'scipy']
+code = f"""
+import sys, pyoifits
+print(' '.join(m for m in {deferred!r} if m in sys.modules))
+"""
+loaded = run(code).split()
+print(f"deferred modules loaded at import: {', '.join(loaded) or 'none'}")
@@ -0,0 +1,56 @@
+# Time merge() of many OIFITS with 1 (serial), 2, 4, and 8 worker
+# processes, and check that the results are identical to the serial merge.
+# The OIFITS are copies of the demo GRAVITY files with shifted dates, so
+# that their data tables are not duplicates.
+#
+# Usage: python benchmark_merge.py [number of OIFITS, default: 64]
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+import numpy as np
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+demo_dir = os.path.join('..', 'demo', 'introfiles')
+filenames = sorted(os.listdir(demo_dir))
+filenames = [os.path.join(demo_dir, f) for f in filenames
+                if f.startswith('gravity') and f.endswith('.fits')]
+
+nfiles = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+hdulists = [oifits.open(f, lazy_load_hdus=False) for f in filenames]
+copies = []
+for i in range(nfiles):
+    hdulist = hdulists[i % len(hdulists)].copy()
+    for hdu in hdulist.get_dataHDUs():
+        hdu.data['MJD'] += i
+    copies.append(hdulist)
+
+# Headers without checksums, which are dated, and raw data
+def contents(hdulist):
+    result = []
+    for hdu in hdulist:
+        header = hdu.header.copy()
+        for keyword in ['CHECKSUM', 'DATASUM']:
+            header.remove(keyword, ignore_missing=True)
+        data = hdu.data
+        if data is not None:
+            data = data.view(np.ndarray).tobytes()
+        result.append((header.tostring(), data))
+    return result
+
+print(f"merge of {nfiles} OIFITS ({os.cpu_count()} CPUs)")
+reference = None
+for workers in [1, 2, 4, 8]:
+    start = time.perf_counter()
+    merged = oifits.merge(*copies, workers=workers)
+    elapsed = time.perf_counter() - start
+    if reference is None:
+        reference = contents(merged)
+    identical = contents(merged) == reference
+    print(f"    workers={workers}: {elapsed:7.2f} s  identical: {identical}")
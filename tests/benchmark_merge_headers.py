@@ -0,0 +1,58 @@
+# Time the merge of many ESO-style primary headers (about 1,400 cards,
+# mostly HIERARCH ESO keywords) as done when merging OIFITS files.  The
+# headers are those of the demo GRAVITY files, with observation dates and
+# ambient conditions changed for each of them, as read from files.
+#
+# Usage: python benchmark_merge_headers.py [number of headers, default: 5000]
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+from astropy.io import fits
+from pyoifits import fitsutils
+
+warnings.simplefilter('ignore')
+
+demo_dir = os.path.join('..', 'demo', 'introfiles')
+filenames = sorted(os.listdir(demo_dir))
+filenames = [os.path.join(demo_dir, f) for f in filenames
+                if f.startswith('gravity') and f.endswith('.fits')]
+
+nheaders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+# Cards changing from one observation to the other (single 80-character
+# cards)
+varying = ['DATE-OBS', 'MJD-OBS', 'UTC', 'LST', 'HIERARCH ESO TEL AMBI FWHM',
+           'HIERARCH ESO TEL AMBI TAU0', 'HIERARCH ESO TEL AMBI TEMP']
+
+# Headers are built as text, and parsed so that cards are as read from a
+# file.
+templates = [fits.getheader(f) for f in filenames]
+texts = [header.tostring() for header in templates]
+headers = []
+for i in range(nheaders):
+    header = templates[i % len(templates)]
+    text = texts[i % len(templates)]
+    for keyword in varying:
+        if keyword in header:
+            index = header.index(keyword)
+            card = header.cards[index]
+            value = card.value
+            if isinstance(value, str):
+                value = f"{value[:-4]}{i % 10000:04d}"
+            else:
+                value = value + i * 1e-3
+            image = str(fits.Card(keyword, value, card.comment))
+            text = text[:80 * index] + image + text[80 * (index + 1):]
+    headers.append(fits.Header.fromstring(text))
+
+ncards = len(templates[0])
+print(f"merge of ESO-style primary headers ({ncards} cards)")
+for n in [nheaders // 10, nheaders // 4, nheaders // 2, nheaders]:
+    start = time.perf_counter()
+    merged = fitsutils.merge_fits_headers(*headers[:n])
+    elapsed = time.perf_counter() - start
+    print(f"    {n:6d} headers: {elapsed:7.2f} s  {len(merged)} cards")
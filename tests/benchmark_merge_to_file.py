@@ -0,0 +1,79 @@
+# Time and measure the peak memory of the merge of many OIFITS files written
+# to disk, with openlist(...).writeto(...) and with merge_to_file(...), and
+# check that the output files are the same.  Each file merges many copies
+# of a demo GRAVITY file with shifted dates, so that the data tables are
+# large and not duplicates.
+#
+# Usage: python benchmark_merge_to_file.py [number of files, default: 8]
+#                                          [copies per file, default: 32]
+
+import sys
+sys.path.append("..")
+
+import os
+import re
+import time
+import tempfile
+import tracemalloc
+import warnings
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+demo_dir = os.path.join('..', 'demo', 'introfiles')
+filenames = sorted(os.listdir(demo_dir))
+filenames = [os.path.join(demo_dir, f) for f in filenames
+                if f.startswith('gravity') and f.endswith('.fits')]
+
+nfiles = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+ncopies = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+# Checksums are dated, and so is the HDU checksum.
+def contents(filename):
+    with open(filename, 'rb') as f:
+        content = f.read()
+    content = re.sub(rb"CHECKSUM= '.{16}'", b"", content)
+    content = re.sub(rb"updated \d{4}-\d\d-\d\dT\d\d:\d\d:\d\d", b"", content)
+    return content
+
+with tempfile.TemporaryDirectory() as tmpdir:
+
+    hdulists = [oifits.open(f, lazy_load_hdus=False) for f in filenames]
+    files = []
+    for i in range(nfiles):
+        copies = []
+        for j in range(ncopies):
+            copy = hdulists[i % len(hdulists)].copy()
+            for hdu in copy.get_dataHDUs():
+                hdu.data['MJD'] += i * ncopies + j
+            copies.append(copy)
+        filename = os.path.join(tmpdir, f"file-{i}.fits")
+        oifits.merge(*copies).writeto(filename)
+        files.append(filename)
+    del hdulists, copies
+
+    def in_memory(output):
+        oifits.openlist(files).writeto(output, overwrite=True)
+
+    def streamed(output):
+        oifits.merge_to_file(files, output, overwrite=True)
+
+    size = sum(os.path.getsize(f) for f in files) / 2**20
+    print(f"merge of {nfiles} OIFITS ({size:.1f} MiB) to a file")
+    outputs = []
+    for func in [in_memory, streamed]:
+        output = os.path.join(tmpdir, f"{func.__name__}.fits")
+        start = time.perf_counter()
+        func(output)
+        elapsed = time.perf_counter() - start
+        # Memory tracing slows down the merge, it is timed separately.
+        tracemalloc.start()
+        func(output)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        print(f"    {func.__name__:10}: {elapsed:7.2f} s  "
+              f"peak memory: {peak:7.1f} MiB")
+        outputs.append(output)
+
+    identical = contents(outputs[0]) == contents(outputs[1])
+    print(f"    identical: {identical}")
@@ -0,0 +1,42 @@
+# Compare the number of files opened per second when the OIFITS version
+# is determined by a first pass over the file (as done up to 0.4.7) and
+# when it is determined while reading (0.5).
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+from astropy.io import fits
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+demo_dir = os.path.join('..', 'demo', 'introfiles')
+filenames = sorted(os.listdir(demo_dir))
+filenames = [os.path.join(demo_dir, f) for f in filenames
+                if f.startswith('gravity') and f.endswith('.fits')]
+
+def open_twice(filename, lazy_load_hdus=True):
+    with fits.open(filename, lazy_load_hdus=True) as hdulist:
+        content = hdulist[0].header.get('CONTENT', '')
+        cls = oifits.OIFITS2 if content == 'OIFITS2' else oifits.OIFITS1
+    return cls.fromfile(filename, lazy_load_hdus=lazy_load_hdus)
+
+def open_once(filename, lazy_load_hdus=True):
+    return oifits.open(filename, lazy_load_hdus=lazy_load_hdus)
+
+def files_per_second(func, lazy_load_hdus, repeat=50):
+    start = time.perf_counter()
+    for i in range(repeat):
+        for filename in filenames:
+            with func(filename, lazy_load_hdus=lazy_load_hdus):
+                pass
+    return repeat * len(filenames) / (time.perf_counter() - start)
+
+for lazy_load_hdus in [True, False]:
+    print(f"lazy_load_hdus={lazy_load_hdus}")
+    for name, func in [('two passes', open_twice), ('one pass', open_once)]:
+        rate = files_per_second(func, lazy_load_hdus)
+        print(f"    {name:10}: {rate:7.1f} files/s")
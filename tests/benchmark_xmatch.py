@@ -0,0 +1,62 @@
+# Time the cross-matching of data tables with their OI_TARGET and OI_ARRAY
+# tables (target names, station names and configurations) on a large
+# table, as done up to 0.4.7 (dictionary lookup per row) and in 0.5 (sorted
+# indices, cached), and check that both give the same results.
+#
+# Usage: python benchmark_xmatch.py [copies of the demo table rows,
+#                                    default: 10000]
+
+import sys
+sys.path.append("..")
+
+import os
+import time
+import warnings
+import numpy as np
+import pyoifits as oifits
+
+warnings.simplefilter('ignore')
+
+filename = os.path.join('..', 'demo', 'introfiles', 'gravity-2.fits')
+ncopies = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+def xmatch_dict(hdu, refhdu, refname, name, concatenate=False):
+    ref_indices = getattr(refhdu, refname)
+    ref_values = getattr(refhdu, name)
+    xmatch = dict(zip(ref_indices, ref_values))
+    indices = getattr(hdu, refname)
+    shape = indices.shape + np.shape(ref_values[0])
+    values = np.reshape([xmatch[i] for i in indices.flatten()], shape)
+    if concatenate:
+        values = [np.atleast_1d(a) for a in values]
+        values = ['-'.join([str(x) for x in a]) for a in values]
+    return values
+
+# A large OI_T3 table made of copies of the rows of the demo one
+hdulist = oifits.open(filename, lazy_load_hdus=False)
+t3 = hdulist.get_t3HDUs()[0]
+rows = np.tile(t3.data.view(np.ndarray), ncopies)
+t3 = type(t3)(data=rows, header=t3.header)
+t3._container = hdulist
+arr, tgt = t3.get_arrayHDU(), t3.get_targetHDU()
+print(f"cross-matching of OI_T3 ({len(t3.data)} rows)")
+
+calls = [
+    ('target', lambda: xmatch_dict(t3, tgt, 'TARGET_ID', 'TARGET'),
+               lambda: t3.get_target()),
+    ('sta_name', lambda: xmatch_dict(t3, arr, 'STA_INDEX', 'STA_NAME'),
+                 lambda: t3.get_sta_name()),
+    ('sta_config', lambda: xmatch_dict(t3, arr, 'STA_INDEX', 'STA_NAME',
+                                       concatenate=True),
+                   lambda: t3.get_sta_config()),
+]
+for what, old, new in calls:
+    times = []
+    for func in [old, new, new]:
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    same = np.array_equal(np.asarray(old()), np.asarray(value))
+    print(f"    {what:10}: dict {times[0] * 1e3:8.2f} ms  "
+          f"sorted {times[1] * 1e3:8.2f} ms  "
+          f"cached {times[2] * 1e3:8.2f} ms  identical: {same}")
@@ -0,0 +1,120 @@
+# Check that OIFITS objects behave as expected when modified in place:
+# OIFITS built by merge() or bin_spectral_channels() are independent of
+# the ones they were built from, renamed tables are renamed in the
+# tables referring to them, reference tables are found after being renamed
+# in the headers, target and station names follow target IDs and station
+# indices set as attributes, and copied tables do not share their data or
+# column names with the original.
+
+import sys
+sys.path.append("..")
+
+import os
+import warnings
+import numpy as np
+from astropy.io import fits
+import pyoifits as oifits
+from pyoifits.hdu.inspol import InspolHDU1
+
+warnings.simplefilter('ignore')
+
+templates_dir = 'templates'
+gravity = os.path.join(templates_dir, 'vlti-gravity-oifits.fits')
+pionier = os.path.join(templates_dir, 'vlti-pionier-oifits.fits')
+
+print("Modifying the sources and the result of a merge")
+a, b = oifits.open(gravity), oifits.open(pionier)
+merged = oifits.merge(a, b)
+wave = merged.get_wavelengthHDUs()[0].data['EFF_WAVE'].copy()
+a.get_wavelengthHDUs()[0].data['EFF_WAVE'][:] *= 2
+b.get_wavelengthHDUs()[0].data['EFF_WAVE'][:] *= 2
+assert (merged.get_wavelengthHDUs()[0].data['EFF_WAVE'] == wave).all()
+mjd = a[-1].data['MJD'].copy()
+merged[-1].data['MJD'][:] += 1
+for hdulist in [a, b]:
+    for hdu in hdulist[1:]:
+        assert hdu.data.flags.writeable
+assert (a[-1].data['MJD'] == mjd).all()
+
+print("Modifying the sources of a merge accumulator")
+a, b = oifits.open(gravity), oifits.open(pionier)
+accumulator = oifits.MergeAccumulator(a, b)
+target = a.get_targetHDU().data['RAEP0'].copy()
+a.get_targetHDU().data['RAEP0'][:] += 1
+merged = accumulator.finalize()
+assert (merged.get_targetHDU().data['RAEP0'][:len(target)] == target).all()
+merged[-1].data['MJD'][:] += 1
+
+print("Modifying the source and the result of a spectral binning")
+a = oifits.open(gravity)
+binned = a.bin_spectral_channels(2)
+target = binned.get_targetHDU().data['RAEP0'].copy()
+a.get_targetHDU().data['RAEP0'][:] += 1
+assert (binned.get_targetHDU().data['RAEP0'] == target).all()
+binned.get_targetHDU().data['RAEP0'][:] += 1
+assert (a.get_targetHDU().data['RAEP0'] == target + 1).all()
+
+print("Renaming an OI_WAVELENGTH table referred to by OI_INSPOL")
+a = oifits.open(gravity)
+whdu = a.get_wavelengthHDUs()[0]
+insname, nwave = whdu.get_insname(), len(whdu.data)
+columns = [
+    fits.Column(name='TARGET_ID', format='1I', array=[1, 1]),
+    fits.Column(name='INSNAME', format='32A', array=[insname, 'OTHER']),
+    fits.Column(name='MJD_OBS', format='1D', array=[0, 0]),
+    fits.Column(name='MJD_END', format='1D', array=[1, 1]),
+    *[fits.Column(name=name, format=f"{nwave}M",
+                  array=np.zeros((2, nwave), dtype=complex))
+            for name in ['JXX', 'JYY', 'JXY', 'JYX']],
+    fits.Column(name='STA_INDEX', format='1I', array=[1, 1]),
+]
+inspol = InspolHDU1.from_columns(columns)
+inspol.header['ARRNAME'] = a.get_arrayHDUs()[0].get_arrname()
+b = type(a)([*a, inspol])
+whdu.rename('RENAMED')
+assert list(inspol.data['INSNAME']) == ['RENAMED', 'OTHER']
+
+print("Modifying target IDs and station indices")
+a = oifits.open(pionier)
+vis2 = a.get_vis2HDUs()[0]
+config = vis2.get_sta_config()
+vis2.STA_INDEX = vis2.STA_INDEX[:, ::-1]
+assert vis2.get_sta_config() == ['-'.join(c.split('-')[::-1]) for c in config]
+target = vis2.get_targetHDU()
+target.TARGET_ID = target.TARGET_ID + 1000
+try:
+    vis2.get_target()
+except KeyError:
+    pass
+else:
+    raise AssertionError('TARGET_ID changed in OI_TARGET not detected')
+vis2.TARGET_ID = 999
+try:
+    vis2.get_target()
+except KeyError:
+    pass
+else:
+    raise AssertionError('unknown TARGET_ID not detected')
+
+print("Renaming an OI_WAVELENGTH table in the headers")
+a = oifits.open(pionier)
+whdu = a.get_wavelengthHDUs()[0]
+insname = whdu.get_insname()
+assert a.get_wavelengthHDU(insname) is whdu
+whdu.header['INSNAME'] = 'NEWNAME'
+for hdu in a.get_dataHDUs():
+    if hdu.header['INSNAME'] == insname:
+        hdu.header['INSNAME'] = 'NEWNAME'
+        assert (hdu.get_wave() == whdu.data['EFF_WAVE']).all()
+assert a.get_wavelengthHDU('NEWNAME') is whdu
+assert a.get_wavelengthHDU(insname) is None
+
+print("Modifying and renaming the columns of a copied table")
+a = oifits.open(pionier)
+vis2 = a.get_vis2HDUs()[0]
+vis2data = vis2.data['VIS2DATA'].copy()
+for copy in [vis2.copy(), vis2.copy().copy()]:
+    copy.data['VIS2DATA'][...] = 0
+    copy.columns.change_name('VIS2DATA', 'NS_VIS2DATA')
+    assert 'VIS2DATA' in vis2.columns.names
+    assert (vis2.data['VIS2DATA'] == vis2data).all()
@@ -1,12 +1,25 @@
-# I generated a lot of OIFITS files with aspro spanning most 
-# supported instruments at VLTI, CHARA, NPOI, & SUSI. We read them
-# to check our compliance-checker.
+# I generated a lot of OIFITS files with aspro spanning most supported
+# instruments at VLTI, CHARA, NPOI, & SUSI. We read them to check our
+# compliance-checker, that tables converted with to_table() after
+# selecting columns have the same values, that merge_to_file() writes
+# the same file as openlist().writeto(), that headers are merged as they
+# always were, that astropy reads OIFITS files as plain FITS files, that
+# scan() summarises the headers, that catalogs select the files the
+# headers point to, that iter_tables() gives the rows of
+# openlist().to_table(), that MergeAccumulator merges as merge() does,
+# and that merges in worker processes are those of serial merges.
 
 import sys
 sys.path.append("..")
 
 import os
+import re
+import tempfile
+import numpy as np
+from astropy.io import fits
+from astropy.table import vstack
 import pyoifits as oifits
+from pyoifits import fitsutils
 
 templates_dir = 'templates'
 templates = sorted(os.listdir(templates_dir))
@@ -26,3 +39,152 @@ print(f"Verifying OIFITS")
 hdulist.verify('fix+warn') # here nothing because openlist will 
                            # silently fix
 print(f"Show contents\n{hdulist}")
+
+print(f"Reading OIFITS files with astropy")
+for filename in templates:
+    with fits.open(filename) as hdulist:
+        assert all(type(hdu).__module__.startswith('astropy.') 
+                                            for hdu in hdulist)
+
+print(f"Selecting columns")
+for filename in templates:
+    if 'vlti' not in filename:
+        continue
+    table = oifits.open(filename).to_table()
+    for columns in [['VIS2DATA'], ['VIS2DATA', 'UCOORD', 'VCOORD'], ['T3PHI']]:
+        if columns[0] not in table['observable']:
+            continue
+        print(f"Converting {filename} to a table, columns={columns}")
+        selected = oifits.open(filename, columns=columns).to_table()
+        rows = table[table['observable'] == selected['observable'][0]]
+        assert len(rows) == len(selected)
+        for name in ['MJD', 'EFF_WAVE', 'U1COORD', 'V1COORD', 'value', 'error']:
+            a, b = rows[name], selected[name]
+            assert np.array_equal(np.ma.getmaskarray(a), np.ma.getmaskarray(b))
+            assert np.array_equal(np.ma.filled(a, 0), np.ma.filled(b, 0))
+
+print(f"Merging files to a file")
+def contents(filename):
+    # checksums are dated, and so is the HDU checksum.
+    with open(filename, 'rb') as f:
+        content = f.read()
+    content = re.sub(rb"CHECKSUM= '.{16}'", b"", content)
+    content = re.sub(rb"updated \d{4}-\d\d-\d\dT\d\d:\d\d:\d\d", b"", content)
+    return content
+pionier = os.path.join(templates_dir, 'vlti-pionier-oifits.fits')
+gravity = os.path.join(templates_dir, 'vlti-gravity-oifits.fits')
+with tempfile.TemporaryDirectory() as tmpdir:
+    # a file whose OI_VIS2 table lacks INT_TIME
+    hdulist = oifits.open(pionier)
+    index = hdulist.index(hdulist.get_vis2HDUs()[0])
+    vis2 = hdulist[index]
+    columns = [col for col in vis2.columns if col.name != 'INT_TIME']
+    vis2 = type(vis2).from_columns(columns, header=vis2.header)
+    hdulist = type(hdulist)([*hdulist[:index], vis2, *hdulist[index+1:]])
+    no_int_time = os.path.join(tmpdir, 'no_int_time.fits')
+    hdulist.writeto(no_int_time, output_verify='ignore')
+    expected = os.path.join(tmpdir, 'expected.fits')
+    streamed = os.path.join(tmpdir, 'streamed.fits')
+    for filenames in [templates, [pionier, pionier, gravity], 
+                      [no_int_time, pionier, gravity]]:
+        print(f"Merging {len(filenames)} files to a file")
+        oifits.openlist(filenames).writeto(expected, overwrite=True)
+        oifits.merge_to_file(filenames, streamed, overwrite=True)
+        assert contents(expected) == contents(streamed)
+
+print(f"Merging headers")
+first = fits.Header([('SIMPLE', True), ('DATE', '2020-01-01'), ('NIGHT', 1),
+                     ('HISTORY', 'first')])
+second = fits.Header([('SIMPLE', True), ('DATE', '2020-01-02'), ('NIGHT', 2),
+                      ('NEW', 'x')])
+third = fits.Header([('NIGHT', 3)])
+# NIGHT is dropped by the second header and added back by the third one
+merged = fitsutils.merge_fits_headers(first, second, third)
+assert list(merged.keys()) == ['SIMPLE', 'DATE', 'NEW', 'NIGHT', 'HISTORY']
+assert merged['DATE'] == 'MULTI' and merged['NIGHT'] == 3
+merged = fitsutils.merge_fits_headers(first, second, third, req_keys=['NIGHT'])
+assert list(merged.keys()) == ['SIMPLE', 'DATE', 'NIGHT', 'NEW', 'HISTORY']
+assert merged['NIGHT'] == 1
+
+print(f"Scanning files")
+summaries = oifits.scan(templates)
+assert [summary['filename'] for summary in summaries] == templates
+for summary in summaries:
+    with fits.open(summary['filename']) as hdulist:
+        hdus = [hdu for hdu in hdulist[1:] 
+                    if hdu.header.get('EXTNAME', '')[0:3] == 'OI_']
+        assert len(summary['hdus']) == len(hdus)
+        for row, hdu in zip(summary['hdus'], hdus):
+            header = hdu.header
+            assert row['extname'] == header['EXTNAME']
+            assert row['nrows'] == header['NAXIS2']
+            for key in ['insname', 'arrname', 'corrname']:
+                assert row[key] == header.get(key.upper())
+            if 'MJD' in hdu.columns.names:
+                mjd = hdu.data['MJD'][np.isfinite(hdu.data['MJD'])]
+                if len(mjd):
+                    assert row['mjd_min'] == mjd.min()
+                    assert row['mjd_max'] == mjd.max()
+        names = {t.strip() for hdu in hdus 
+                    if hdu.header['EXTNAME'] == 'OI_TARGET'
+                        for t in hdu.data['TARGET']}
+        assert summary['targets'] == sorted(names)
+
+print(f"Selecting files in a catalog")
+targets, insnames = {}, {}
+for filename in templates:
+    with fits.open(filename) as hdulist:
+        data = [hdu for hdu in hdulist[1:] if hdu.header.get('EXTNAME') in
+                    ['OI_VIS', 'OI_VIS2', 'OI_T3', 'OI_FLUX']]
+        names = {t.strip() for hdu in hdulist[1:] 
+                    if hdu.header.get('EXTNAME') == 'OI_TARGET'
+                        for t in hdu.data['TARGET']}
+    filename = os.path.abspath(filename)
+    for name in names if data else []:
+        targets.setdefault(name, []).append(filename)
+    for name in {hdu.header['INSNAME'] for hdu in data}:
+        insnames.setdefault(name, []).append(filename)
+catalog = oifits.Catalog()
+catalog.update(templates)
+assert len(catalog) == len(templates)
+for target, filenames in targets.items():
+    assert catalog.select(target=target) == filenames
+for insname, filenames in insnames.items():
+    assert catalog.select(insname=insname) == filenames
+
+print(f"Iterating over tables")
+vlti = [filename for filename in templates if 'vlti' in filename]
+iterated = vstack([table for filename, table in oifits.iter_tables(vlti)])
+table = oifits.openlist(vlti).to_table()
+assert iterated.colnames == table.colnames
+keys = ['MJD', 'EFF_WAVE', 'observable', 'STA_CONFIG', 'U1COORD', 'V1COORD',
+        'U2COORD', 'V2COORD', 'value']
+iterated.sort(keys)
+table.sort(keys)
+for name in table.colnames:
+    a, b = iterated[name], table[name]
+    assert np.array_equal(np.ma.getmaskarray(a), np.ma.getmaskarray(b))
+    assert np.array_equal(np.ma.filled(a, 0), np.ma.filled(b, 0))
+
+print(f"Merging incrementally")
+def hdu_contents(hdulist):
+    # checksums are dated
+    result = []
+    for hdu in hdulist:
+        header = hdu.header.copy()
+        for keyword in ['CHECKSUM', 'DATASUM']:
+            header.remove(keyword, ignore_missing=True)
+        data = hdu.data
+        if data is not None:
+            data = data.view(np.ndarray).tobytes()
+        result.append((header.tostring(), data))
+    return result
+hdulists = [oifits.open(f, lazy_load_hdus=False) for f in templates]
+merged = hdu_contents(oifits.merge(*hdulists))
+accumulator = oifits.MergeAccumulator()
+for hdulist in hdulists:
+    accumulator.add(hdulist)
+assert hdu_contents(accumulator.finalize()) == merged
+
+print(f"Merging in worker processes")
+assert hdu_contents(oifits.merge(*hdulists, workers=2)) == merged